@@ -0,0 +1,257 @@
+#!/usr/bin/env -S uv run
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "requests",
+#     "urllib3[brotli]",
+# ]
+# ///
+
+import argparse
+import gc
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import date as date_type
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import main  # noqa: E402
+
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+EXAMPLES_DIR = os.path.join(os.path.dirname(BENCH_DIR), "examples")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+CORPUS_URL = "https://denikn.cz/newsletter/1934206/__trashed-4/"
+GROUP_START = '<div class="wp-block-dn-newsletter-r5m-group">'
+MIN_RUN_SECONDS = 0.05
+REPEATS = 5
+
+
+def run_article_text_extractor(html_text):
+    extractor = main.ArticleTextExtractor()
+    extractor.feed(html_text)
+    extractor.flush_line()
+    return extractor.lines
+
+
+HTML_BENCHMARKS = {
+    "parse_article_page": main.parse_article_page,
+    "extract_json_ld_article": main.extract_json_ld_article,
+    "extract_newsletter_minutes": main.extract_newsletter_minutes,
+    "ArticleTextExtractor": run_article_text_extractor,
+    "fallback_strip_html": main.fallback_strip_html,
+    "parse_article": lambda html_text: main.parse_article(CORPUS_URL, html_text),
+}
+FEED_BENCHMARKS = {
+    "parse_rss_links_by_date": lambda xml_text: main.parse_rss_links_by_date(
+        xml_text, [date_type(2026, 1, 6), date_type(2025, 1, 1)]
+    ),
+}
+
+
+def scale_page(html_text, factor):
+    """Repeat the newsletter group body (or the whole body) `factor` times."""
+    if factor == 1:
+        return html_text
+    start = html_text.find(GROUP_START)
+    if start == -1:
+        start = html_text.index("<body")
+        start = html_text.index(">", start) + 1
+        end = html_text.rindex("</body>")
+    else:
+        start += len(GROUP_START)
+        depth = 1
+        for match in re.finditer(r"<(/?)div\b", html_text[start:]):
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                end = start + match.start()
+                break
+        else:
+            end = len(html_text)
+    return html_text[:start] + html_text[start:end] * factor + html_text[end:]
+
+
+def scale_feed(xml_text, factor):
+    if factor == 1:
+        return xml_text
+    start = xml_text.index("<item>")
+    end = xml_text.rindex("</item>") + len("</item>")
+    return xml_text[:start] + xml_text[start:end] * factor + xml_text[end:]
+
+
+def load_corpus(scales):
+    documents = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        path = os.path.join(CORPUS_DIR, name)
+        with open(path, encoding="utf-8") as handle:
+            text = handle.read()
+        if name.endswith(".html"):
+            kind, scale = "html", scale_page
+        elif name.endswith(".xml"):
+            kind, scale = "feed", scale_feed
+        else:
+            continue
+        for factor in scales:
+            documents.append(
+                {
+                    "name": f"{name}x{factor}",
+                    "kind": kind,
+                    "text": scale(text, factor),
+                }
+            )
+    return documents
+
+
+def measure(function, argument):
+    """Best seconds per call over REPEATS runs, then peak traced memory."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_RUN_SECONDS:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(REPEATS - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        best = min(best, (time.perf_counter() - started) / loops)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(documents, only=None):
+    results = {}
+    for document in documents:
+        benchmarks = dict(
+            HTML_BENCHMARKS if document["kind"] == "html" else FEED_BENCHMARKS
+        )
+        if document["kind"] == "html":
+            article = main.parse_article(CORPUS_URL, document["text"])
+            benchmarks["format_typst"] = lambda _, article=article: main.format_typst(
+                article
+            )
+        size = len(document["text"].encode("utf-8"))
+        for name, function in benchmarks.items():
+            if only and name not in only:
+                continue
+            seconds, peak = measure(function, document["text"])
+            results[f"{name}[{document['name']}]"] = {
+                "seconds": seconds,
+                "mb_per_s": size / seconds / 1e6,
+                "peak_kib": peak / 1024,
+            }
+    return results
+
+
+def verify_examples():
+    """Rendering a corpus page must reproduce its committed example."""
+    failures = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if not name.endswith(".html"):
+            continue
+        example = os.path.join(EXAMPLES_DIR, f"{name[:-5]}.typ")
+        if not os.path.exists(example):
+            continue
+        with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as handle:
+            article = main.parse_article(CORPUS_URL, handle.read())
+        with open(example, encoding="utf-8") as handle:
+            if main.format_typst(article) != handle.read():
+                failures.append(name)
+    return failures
+
+
+def compare(results, baseline, max_regression):
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric in ("seconds", "peak_kib"):
+            if result[metric] > previous[metric] * (1 + max_regression):
+                regressions.append(
+                    f"{key} {metric}: {previous[metric]:.6g} -> {result[metric]:.6g}"
+                )
+    return regressions
+
+
+def print_table(results, baseline):
+    print(
+        f"{'benchmark':<64} {'ms/call':>10} {'MB/s':>8} {'peak KiB':>10} {'vs base':>8}"
+    )
+    for key, result in results.items():
+        previous = baseline.get(key)
+        change = (
+            f"{result['seconds'] / previous['seconds'] - 1:+.0%}" if previous else ""
+        )
+        print(
+            f"{key:<64} {result['seconds'] * 1000:>10.3f} "
+            f"{result['mb_per_s']:>8.2f} {result['peak_kib']:>10.1f} {change:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark extraction and rendering over bench/corpus."
+    )
+    parser.add_argument(
+        "--scales",
+        default="1,10,100",
+        help="Comma-separated page size multipliers.",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=None,
+        help="Run only this benchmark (repeatable).",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_PATH,
+        help="Baseline JSON to compare against.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store this run as the new baseline.",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown / memory growth before failing (0.25 = 25%%).",
+    )
+    args = parser.parse_args()
+
+    failures = verify_examples()
+    for name in failures:
+        print(f"Output changed: {name} no longer renders to its example.")
+    scales = [int(value) for value in args.scales.split(",")]
+    results = run_benchmarks(load_corpus(scales), only=args.only)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print_table(results, baseline)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+        print(f"Baseline written: {args.baseline}")
+    regressions = compare(results, baseline, args.max_regression)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if failures or regressions:
+        sys.exit(1)
@@ -0,0 +1,112 @@
+#!/usr/bin/env -S uv run
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "requests",
+#     "urllib3[brotli]",
+# ]
+# ///
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_PATH = os.path.join(os.path.dirname(BENCH_DIR), "main.py")
+RUNS = 20
+# Must stay out of `import main`; they are loaded by the stages that use them.
+LAZY_MODULES = (
+    "requests",
+    "urllib3",
+    "concurrent.futures",
+    "email.utils",
+    "asyncio",
+    "dataclasses",
+)
+
+COMMANDS = {
+    "interpreter": [sys.executable, "-c", "pass"],
+    "import": [
+        sys.executable,
+        "-c",
+        f"import sys; sys.path.insert(0, {os.path.dirname(MAIN_PATH)!r}); import main",
+    ],
+    "version": [sys.executable, MAIN_PATH, "--version"],
+    "help": [sys.executable, MAIN_PATH, "--help"],
+    "check": [sys.executable, MAIN_PATH, "--check"],
+}
+
+
+def measure(command, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def eagerly_imported():
+    code = (
+        f"import sys; sys.path.insert(0, {os.path.dirname(MAIN_PATH)!r}); "
+        "import main; "
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return output.split()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure main.py startup time in fresh interpreters."
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=RUNS,
+        help="Launches per command.",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=None,
+        help="Measure only this command (repeatable).",
+    )
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=None,
+        help="Fail when `--version` takes longer than this above the interpreter.",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'command':<14} {'min ms':>8} {'median ms':>10}")
+    for name, command in COMMANDS.items():
+        if args.only and name not in args.only and name != "interpreter":
+            continue
+        results[name] = measure(command, args.runs)
+        print(f"{name:<14} {results[name][0]:>8.1f} {results[name][1]:>10.1f}")
+
+    failed = False
+    eager = eagerly_imported()
+    if eager:
+        print(f"Imported at startup: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and "version" in results:
+        overhead = results["version"][0] - results["interpreter"][0]
+        if overhead > args.max_ms:
+            print(f"--version overhead {overhead:.1f} ms > {args.max_ms:.1f} ms")
+            failed = True
+    if failed:
+        sys.exit(1)
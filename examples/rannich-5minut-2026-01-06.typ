@@ -1,37 +1,5 @@
-
-#import "@preview/cades:0.3.1": qr-code
-#set page(
-  paper: "a4",
-  columns: 2,
-  margin: 1cm,
-  footer: context [
-  *Ranních 5 minut -- úterý -- 2026-01-06T01:07:23+01:00*
-    #h(1fr)
-    #counter(page).display(
-      "1/1",
-      both: true,
-    )
-  ]
-)
-
-#set columns(gutter: 12pt)
-#set text(
-  font: "Franklin Gothic FS",
-  size: 10pt,
-)
-
-#let separator(
-  width: 60%,
-  stroke: 0.5pt,
-  top-gap: 0.1em,
-  bottom-gap: 0.1em,
-) = {
-  v(top-gap)
-  align(center)[
-    #line(length: width, stroke: stroke)
-  ]
-  v(bottom-gap)
-}
+#import "rannich-5minut-layout.typ": issue, qr-code, separator
+#show: issue.with(layout: "a4", name: [Ranních 5 minut], weekday: [úterý], date: [2026-01-06T01:07:23+01:00])
 
 = Babiš potvrdil, že prezidentovi ponese nominaci Turka na ministra
 _Vydáno: 2026-01-06T01:07:23+01:00, úterý_
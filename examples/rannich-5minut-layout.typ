@@ -0,0 +1,47 @@
+#import "@preview/cades:0.3.1": qr-code
+
+#let layouts = (
+  "a4": (page: (paper: "a4", columns: 2, margin: 1cm), size: 10pt),
+  "a5-booklet": (page: (paper: "a5", binding: left, margin: (inside: 1.5cm, outside: 1cm, y: 1.2cm)), size: 9pt),
+  "eink": (page: (width: 90mm, height: 120mm, margin: 4mm), size: 11pt),
+)
+
+#let separator(
+  width: 60%,
+  stroke: 0.5pt,
+  top-gap: 0.1em,
+  bottom-gap: 0.1em,
+) = {
+  v(top-gap)
+  align(center)[
+    #line(length: width, stroke: stroke)
+  ]
+  v(bottom-gap)
+}
+
+#let issue(
+  layout: "a4",
+  name: none,
+  weekday: none,
+  date: none,
+  body,
+) = {
+  let settings = layouts.at(layout)
+  set page(
+    ..settings.page,
+    footer: context [
+      *#name#for part in (weekday, date).filter(part => part != none) [ -- #part]*
+      #h(1fr)
+      #counter(page).display(
+        "1/1",
+        both: true,
+      )
+    ],
+  )
+  set columns(gutter: 12pt)
+  set text(
+    font: "Franklin Gothic FS",
+    size: settings.size,
+  )
+  body
+}
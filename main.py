@@ -3,25 +3,185 @@
 # requires-python = ">=3.12"
 # dependencies = [
 #     "requests",
+#     "urllib3[brotli]",
 # ]
 # ///
 
 import argparse
+import codecs
+import gzip
+import hashlib
 import html
+import importlib.util
+import io
 import json
+import math
+import os
+import random
 import re
+import shutil
+import signal
+import sqlite3
 import subprocess
+import sys
+import tempfile
+import threading
 import time
+from collections import OrderedDict
+from collections import deque
+from contextlib import contextmanager
 from datetime import date as date_type
 from datetime import datetime
-from email.utils import parsedate_to_datetime
+from datetime import time as time_type
+from datetime import timedelta
 from html.parser import HTMLParser
 
-import requests
-
 
 FEED_URL = "https://denikn.cz/newsletter/rannich-5-minut/feed/"
+VERSION = "0.1.0"
 POLL_INTERVAL_SECONDS = 60 * 5
+POLL_MIN_INTERVAL_SECONDS = 60
+POLL_WINDOW_SECONDS = 60 * 20
+POLL_JITTER = 0.1
+POLL_TIMEOUT_MINUTES = 60 * 6
+
+HTTP_TIMEOUT_SECONDS = 20
+HTTP_RETRIES = 3
+HTTP_BACKOFF_SECONDS = 1.0
+HTTP_MAX_BYTES = 10 * 1024 * 1024
+HTTP_CHUNK_SIZE = 64 * 1024
+ARTICLE_MAX_BYTES = 4 * 1024 * 1024
+# Download plus parse of one issue page; past it we keep what was extracted.
+EXTRACT_BUDGET_SECONDS = 30
+EXTRACT_MAX_CHARS = 2 * 1024 * 1024
+EXTRACT_MAX_ITEMS = 500
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "rannich-5minut",
+)
+CACHE_FRESH_SECONDS = 60 * 60 * 6
+CACHE_TTL_SECONDS = 60 * 60 * 24 * 30
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+BACKFILL_WORKERS = 4
+
+# Linked stories (--stories): fetched alongside the issue, never holding it up.
+STORY_WORKERS = 4
+STORY_TIMEOUT_SECONDS = 5
+STORY_BUDGET_SECONDS = 15
+STORY_LEDE_CHARS = 240
+PIPELINE_TYPST_JOBS = 2
+
+# Same windows as systemd/rannich-5minut.timer, indexed by weekday().
+SERVE_SCHEDULE = (
+    time_type(7, 2),
+    time_type(7, 2),
+    time_type(7, 2),
+    time_type(7, 2),
+    time_type(7, 2),
+    time_type(8, 2),
+    time_type(8, 2),
+)
+CONFIG_DIR = os.path.join(
+    os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+    "rannich-5minut",
+)
+PRINTERS_CONFIG_PATH = os.path.join(CONFIG_DIR, "printers.toml")
+PRINT_OPTIONS = {"sides": "two-sided-long-edge", "media": "iso_a4_210x297mm"}
+PRINT_TIMEOUT_SECONDS = 60
+PRINT_RETRIES = 2
+PRINT_RETRY_DELAY_SECONDS = 5
+
+PROFILE_MAX_RECORDS = 10000
+
+SERVE_STATUS_PATH = os.path.join(CACHE_DIR, "status.json")
+SERVE_SLEEP_SECONDS = 60
+
+RELAY_PORT = 8750
+# A long-poll is answered at the latest after this; clients ask again.
+RELAY_MAX_WAIT_SECONDS = 300
+# Deník N is asked about one issue at most this often, however many clients.
+RELAY_RECHECK_SECONDS = 60
+RELAY_PDF_CACHE = 32
+RELAY_PATH = re.compile(r"/([\w.-]+)/(\d{4}-\d{2}-\d{2})\.(json|pdf)")
+RELAY_PDF_PATH = re.compile(r"/pdf/([0-9a-f]{64})\.pdf")
+
+TYPST_TIMEOUT_SECONDS = 120
+TYPST_SETTLE_SECONDS = 0.2
+# Fonts and packages are already loaded in a watcher, so a build this slow is stuck.
+TYPST_WATCH_TIMEOUT_SECONDS = 30
+TYPST_WATCH_ERROR = re.compile(r"^error: .*$", re.MULTILINE)
+TYPST_QR_PACKAGE = "@preview/cades:0.3.1"
+TYPST_FONT = "Franklin Gothic FS"
+# Page arguments and text size per layout, spliced into the layout module,
+# and the lpr media and duplex that match the page.
+TYPST_LAYOUTS = {
+    "a4": ('(paper: "a4", columns: 2, margin: 1cm)', "10pt", PRINT_OPTIONS),
+    "a5-booklet": (
+        (
+            '(paper: "a5", binding: left, '
+            "margin: (inside: 1.5cm, outside: 1cm, y: 1.2cm))"
+        ),
+        "9pt",
+        {"sides": "two-sided-long-edge", "media": "iso_a5_148x210mm"},
+    ),
+    "eink": (
+        "(width: 90mm, height: 120mm, margin: 4mm)",
+        "11pt",
+        {"sides": "one-sided", "media": "Custom.90x120mm"},
+    ),
+}
+TYPST_DEFAULT_LAYOUT = "a4"
+TYPST_LAYOUT_MODULE = "rannich-5minut-layout.typ"
+# Backslash first; str.translate is several times slower than chained
+# replace on non-ASCII text, so lines are only rewritten when they need it.
+TYPST_TEXT_ESCAPES = (
+    ("\\", "\\\\"),
+    ("*", "\\*"),
+    ("_", "\\_"),
+    ("#", "\\#"),
+    ("[", "\\["),
+    ("]", "\\]"),
+    ("{", "\\{"),
+    ("}", "\\}"),
+)
+TYPST_TEXT_SPECIAL = re.compile(r"[\\*_#\[\]{}]")
+ISO_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+CZECH_WEEKDAYS = ("pondělí", "úterý", "středa", "čtvrtek", "pátek", "sobota", "neděle")
+TYPST_PACKAGE_URL = "https://packages.typst.org/{namespace}/{name}-{version}.tar.gz"
+DATA_DIR = os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"),
+    "rannich-5minut",
+)
+TYPST_ASSETS_DIR = os.path.join(DATA_DIR, "typst")
+
+ARCHIVE_PATH = os.path.join(DATA_DIR, "archive.sqlite3")
+ARCHIVE_SEARCH_LIMIT = 20
+
+# Newsletters known out of the box; more are read from SOURCES_CONFIG_PATH.
+DEFAULT_SOURCE = "rannich-5minut"
+NEWSLETTER_SOURCES = {
+    DEFAULT_SOURCE: {
+        "key": DEFAULT_SOURCE,
+        "title": "Ranních 5 minut",
+        "feed_url": FEED_URL,
+        "group_class": "wp-block-dn-newsletter-r5m-group",
+        "minute_class": "wp-block-dn-newsletter-r5m-minute",
+        "extra_marker": "Počasí",
+        "layout": TYPST_DEFAULT_LAYOUT,
+    },
+}
+SOURCE_FIELDS = (
+    "key",
+    "feed_url",
+    "title",
+    "group_class",
+    "minute_class",
+    "extra_marker",
+    "layout",
+)
+SOURCES_CONFIG_PATH = os.path.join(CONFIG_DIR, "sources.toml")
 
 DEFAULT_HEADERS = {
     "User-Agent": (
@@ -31,58 +191,527 @@ DEFAULT_HEADERS = {
 }
 
 
-def http_get(url, timeout=20):
-    response = requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
-    response.raise_for_status()
-    return response
+class Profiler:
+    """Wall/CPU time and sizes of pipeline stages, one JSON record each.
 
+    CPU time is the calling thread's; time spent in child processes
+    (typst, lpr) only shows up as wall time.
+    """
 
-class DateNotAvailableError(RuntimeError):
+    def __init__(self, log_path=None, max_records=PROFILE_MAX_RECORDS):
+        self.log_path = log_path
+        self.records = deque(maxlen=max_records)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        record = {"stage": name, **fields}
+        started_at = datetime.now().isoformat()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException as exc:
+            record["error"] = type(exc).__name__
+            raise
+        finally:
+            record["started_at"] = started_at
+            record["wall_ms"] = round((time.perf_counter() - wall_start) * 1000, 3)
+            record["cpu_ms"] = round((time.thread_time() - cpu_start) * 1000, 3)
+            self.emit(record)
+
+    def emit(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.records.append(record)
+            if self.log_path == "-":
+                print(line, file=sys.stderr)
+            elif self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as handle:
+                    handle.write(line + "\n")
+
+    def summary(self):
+        totals = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(
+                record["stage"], {"count": 0, "wall_ms": 0, "cpu_ms": 0, "bytes": 0}
+            )
+            total["count"] += 1
+            total["wall_ms"] += record["wall_ms"]
+            total["cpu_ms"] += record["cpu_ms"]
+            total["bytes"] += record.get("bytes") or 0
+        lines = [
+            f"{'stage':<16} {'count':>5} {'wall ms':>10} {'cpu ms':>10} {'bytes':>10}"
+        ]
+        for name, total in totals.items():
+            lines.append(
+                f"{name:<16} {total['count']:>5} {total['wall_ms']:>10.1f} "
+                f"{total['cpu_ms']:>10.1f} {total['bytes']:>10}"
+            )
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
+
+_http_session = None
+
+
+def http_session():
+    """Shared keep-alive session with retries and compressed transfer.
+
+    requests and urllib3 are imported here, on the first network access,
+    so runs that never touch the network start without them.
+    """
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import Retry
+        from urllib3.util import make_headers
+
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=HTTP_BACKOFF_SECONDS,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=8)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        # Advertises br only when brotli is importable, urllib3 decodes it.
+        session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)[
+            "accept-encoding"
+        ]
+        _http_session = session
+    return _http_session
+
+
+class ResponseTooLargeError(RuntimeError):
     pass
 
 
-def fetch_latest_overview_url(target_date=None):
-    if target_date is None:
-        target_date = date_type.today()
+def http_get(url, timeout=HTTP_TIMEOUT_SECONDS, headers=None, max_bytes=HTTP_MAX_BYTES):
+    with http_stream(url, timeout=timeout, headers=headers) as response:
+        read_limited(response, max_bytes)
+    return response
+
+
+@contextmanager
+def http_stream(url, timeout=HTTP_TIMEOUT_SECONDS, headers=None):
+    """GET whose body is read by the caller; closed when the block exits."""
+    response = http_session().get(url, headers=headers, timeout=timeout, stream=True)
     try:
-        response = http_get(FEED_URL)
-    except Exception as exc:
-        raise RuntimeError("Could not fetch the RSS feed.") from exc
+        response.raise_for_status()
+        yield response
+    finally:
+        response.close()
 
-    url = parse_rss_for_latest_link(response.text, target_date=target_date)
-    if url:
-        return url
-    raise DateNotAvailableError(
-        f"No RSS entry found for date {target_date.isoformat()}."
-    )
 
+def iter_limited(response, max_bytes):
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLargeError(
+            f"Response from {response.url} exceeds {max_bytes} bytes."
+        )
+    size = 0
+    for chunk in response.iter_content(HTTP_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ResponseTooLargeError(
+                f"Response from {response.url} exceeds {max_bytes} bytes."
+            )
+        yield chunk
 
-def parse_rss_for_latest_link(xml_text, target_date):
+
+def read_limited(response, max_bytes):
+    # Leave the response usable through .content/.text like a non-streamed one.
+    response._content = b"".join(iter_limited(response, max_bytes))
+    return response._content
+
+
+class CacheMissError(RuntimeError):
+    pass
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` through a temp file in the same directory."""
+    # A unique temp file per write: backfill workers, story prefetch and
+    # relay handler threads can store the same file at once.
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".",
+        prefix=f"{os.path.basename(path)}.",
+        suffix=".tmp",
+    )
     try:
-        import xml.etree.ElementTree as ET
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class HttpCache:
+    """On-disk cache of fetched pages and parsed articles.
+
+    Response bodies are stored gzip-compressed under their SHA-256, so an
+    unchanged page is stored once. Each URL has a small JSON entry with the
+    HTTP validators, the body digest and (for articles) the parsed result.
+    """
+
+    def __init__(
+        self,
+        root=CACHE_DIR,
+        fresh_seconds=CACHE_FRESH_SECONDS,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        max_bytes=CACHE_MAX_BYTES,
+    ):
+        self.root = root
+        self.fresh_seconds = fresh_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(root, "entries")
+        self.blobs_dir = os.path.join(root, "blobs")
+
+    def get(self, url):
+        try:
+            with open(self._entry_path(url), encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def body(self, entry):
+        try:
+            with gzip.open(self._blob_path(entry["blob"]), "rb") as handle:
+                content = handle.read()
+        except (OSError, KeyError):
+            return None
+        return content.decode(entry.get("encoding") or "utf-8", errors="replace")
+
+    def put(self, url, response, article=None):
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(self.blobs_dir, exist_ok=True)
+            write_atomic(blob_path, gzip.compress(content))
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "blob": digest,
+            "fetched_at": time.time(),
+            "article": article,
+        }
+        self.save(url, entry)
+        return entry
+
+    def save(self, url, entry):
+        os.makedirs(self.entries_dir, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        write_atomic(self._entry_path(url), data)
+
+    def touch(self, url, entry):
+        entry["fetched_at"] = time.time()
+        self.save(url, entry)
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.fresh_seconds
+
+    def same_body(self, entry, response):
+        return entry.get("blob") == hashlib.sha256(response.content).hexdigest()
+
+    def validators(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def entries(self):
+        try:
+            names = os.listdir(self.entries_dir)
+        except OSError:
+            return
+        for name in names:
+            try:
+                with open(
+                    os.path.join(self.entries_dir, name), encoding="utf-8"
+                ) as handle:
+                    yield json.load(handle)
+            except (OSError, ValueError):
+                continue
 
-        root = ET.fromstring(xml_text)
-    except Exception:
+    def find_article_url(self, target_date, source=DEFAULT_SOURCE):
+        for entry in self.entries():
+            article = entry.get("article")
+            if not article or article.get("source", DEFAULT_SOURCE) != source:
+                continue
+            if extract_date_only(article.get("date")) == target_date.isoformat():
+                return entry["url"]
         return None
 
-    channel = root.find("channel")
-    if channel is None:
-        channel = root.find("{*}channel")
-    if channel is None:
+    def evict(self):
+        """Drop entries past the TTL, then the oldest ones over the size cap."""
+        now = time.time()
+        entries = sorted(self.entries(), key=lambda entry: entry.get("fetched_at", 0))
+        kept = []
+        for entry in entries:
+            if now - entry.get("fetched_at", 0) > self.ttl_seconds:
+                self._remove(self._entry_path(entry["url"]))
+            else:
+                kept.append(entry)
+        sizes = {}
+        for entry in kept:
+            try:
+                sizes[entry["blob"]] = os.path.getsize(self._blob_path(entry["blob"]))
+            except OSError:
+                sizes[entry["blob"]] = 0
+        total = sum(sizes.values())
+        while kept and total > self.max_bytes:
+            entry = kept.pop(0)
+            self._remove(self._entry_path(entry["url"]))
+            if all(other["blob"] != entry["blob"] for other in kept):
+                total -= sizes.pop(entry["blob"], 0)
+        referenced = {entry["blob"] for entry in kept}
+        try:
+            blobs = os.listdir(self.blobs_dir)
+        except OSError:
+            return
+        for name in blobs:
+            if name.split(".", 1)[0] not in referenced:
+                self._remove(os.path.join(self.blobs_dir, name))
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.entries_dir, f"{key}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, f"{digest}.gz")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class DateNotAvailableError(RuntimeError):
+    pass
+
+
+def fetch_latest_overview_url(target_date=None):
+    return FeedPoller().fetch_overview_url(target_date)
+
+
+class FeedPoller:
+    """Conditional-GET feed fetcher that remembers validators between polls.
+
+    The feed is parsed while it downloads. Reading stops as soon as every
+    requested date has a link; a feed read to the end is kept as a
+    date -> link index, so a 304 answer needs no parsing at all.
+    """
+
+    def __init__(self, feed_url=FEED_URL, cache=None, offline=False, source=None):
+        self.feed_url = feed_url
+        self.source = source or NEWSLETTER_SOURCES[DEFAULT_SOURCE]
+        self.cache = cache
+        self.offline = offline
+        self.etag = None
+        self.last_modified = None
+        self.feed_text = None
+        self.publish_times = []
+        self.index = {}
+        entry = cache.get(feed_url) if cache else None
+        if entry:
+            self.feed_text = cache.body(entry)
+            if self.feed_text is not None:
+                self.etag = entry.get("etag")
+                self.last_modified = entry.get("last_modified")
+                self.index, self.publish_times, _ = index_rss_items(
+                    iter_rss_items(iter_text_chunks(self.feed_text))
+                )
+
+    def fetch_overview_url(self, target_date=None):
+        if target_date is None:
+            target_date = date_type.today()
+        url = self.fetch_overview_urls([target_date]).get(target_date)
+        if url:
+            return url
+        raise DateNotAvailableError(
+            f"No RSS entry found for date {target_date.isoformat()}."
+        )
+
+    def fetch_overview_urls(self, dates):
+        """Map each of `dates` found in the feed to its link (one parse)."""
+        try:
+            links = self.refresh(dates)
+        except CacheMissError:
+            # Offline with no complete feed cached: look the articles up below.
+            links = {}
+        except Exception as exc:
+            raise RuntimeError("Could not fetch the RSS feed.") from exc
+
+        urls = {day: links[day] for day in dates if day in links}
+        if self.offline:
+            for day in dates:
+                if day not in urls:
+                    url = self.cache.find_article_url(day, self.source["key"])
+                    if url:
+                        urls[day] = url
+        return urls
+
+    def refresh(self, dates=()):
+        """Return the feed's links by date, downloading only what is needed."""
+        if self.offline:
+            if self.feed_text is None:
+                raise CacheMissError(f"{self.feed_url} is not in the cache.")
+            return self.index
+        headers = {}
+        if self.feed_text is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        with PROFILER.stage("feed_fetch", url=self.feed_url) as record:
+            with http_stream(self.feed_url, headers=headers) as response:
+                record["status"] = response.status_code
+                if response.status_code == 304 and self.feed_text is not None:
+                    return self.index
+                body = []
+
+                def chunks():
+                    for chunk in iter_limited(response, HTTP_MAX_BYTES):
+                        body.append(chunk)
+                        yield chunk
+
+                links, publish_times, complete = index_rss_items(
+                    iter_rss_items(chunks()), dates or None
+                )
+            record["bytes"] = sum(len(chunk) for chunk in body)
+            record["items"] = len(links)
+            record["complete"] = complete
+        if not complete:
+            # Validators and cache only describe feeds that were read in full.
+            return links
+        response._content = b"".join(body)
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.feed_text = response.text
+        self.index = links
+        self.publish_times = publish_times
+        if self.cache:
+            self.cache.put(self.feed_url, response)
+        return links
+
+
+def next_poll_delay(now, publish_times, deadline):
+    """Seconds until the next feed check, or None once the deadline passed.
+
+    Polls tightly around the usual publish time seen in the feed, sleeps
+    until that window otherwise and falls back to the fixed interval when
+    the issue is late.
+    """
+    remaining = (deadline - now).total_seconds()
+    if remaining <= 0:
         return None
+    delay = POLL_INTERVAL_SECONDS
+    if publish_times:
+        import statistics
 
-    for item in channel.findall("item") + channel.findall("{*}item"):
-        link = item.findtext("link") or item.findtext("{*}link")
-        if not link:
-            continue
-        item_date = parse_rss_item_date(item)
-        if not item_date or item_date != target_date:
+        expected = statistics.median(publish_times)
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        offset = seconds - expected
+        if abs(offset) <= POLL_WINDOW_SECONDS:
+            delay = POLL_MIN_INTERVAL_SECONDS
+        elif offset < 0:
+            delay = -offset - POLL_WINDOW_SECONDS
+    delay *= random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+    return max(1, min(delay, remaining))
+
+
+def parse_rss_for_latest_link(xml_text, target_date):
+    return parse_rss_links_by_date(xml_text, [target_date]).get(target_date)
+
+
+def parse_rss_links_by_date(xml_text, dates):
+    links, _, _ = index_rss_items(iter_rss_items(iter_text_chunks(xml_text)), dates)
+    return {day: links[day] for day in dates if day in links}
+
+
+def iter_text_chunks(text, size=HTTP_CHUNK_SIZE):
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def iter_rss_items(chunks):
+    """Yield (published datetime, link) for each item as it completes.
+
+    Parsing is incremental, processed items are cleared, and nothing more
+    is pulled from `chunks` once the consumer stops iterating. Malformed
+    XML ends the iteration.
+    """
+    import xml.etree.ElementTree as ET
+
+    # Only "end" events: tracking element depth via "start" costs more
+    # than the whole item lookup.
+    parser = ET.XMLPullParser(events=("end",))
+    for chunk in chunks:
+        try:
+            parser.feed(chunk)
+            events = list(parser.read_events())
+        except ET.ParseError:
+            return
+        for _, element in events:
+            if element.tag != "item" and not element.tag.endswith("}item"):
+                continue
+            link = element.findtext("link") or element.findtext("{*}link")
+            published = parse_rss_item_datetime(element)
+            element.clear()
+            if link:
+                yield published, link.strip()
+
+
+def index_rss_items(items, dates=None):
+    """Collect the first link per date, plus local publish times of day.
+
+    With `dates`, stops as soon as all of them are found. Returns
+    (links by date, publish times in seconds, whether all items were read).
+    """
+    wanted = set(dates) if dates is not None else None
+    links = {}
+    times = []
+    for published, link in items:
+        if published is None:
             continue
-        return link.strip()
-    return None
+        links.setdefault(published.date(), link)
+        if published.tzinfo is not None:
+            published = published.astimezone()
+            times.append(published.hour * 3600 + published.minute * 60)
+        if wanted is not None and wanted <= links.keys():
+            return links, times, False
+    return links, times, True
 
 
 def parse_rss_item_date(item):
+    published = parse_rss_item_datetime(item)
+    if published is None:
+        return None
+    return published.date()
+
+
+def parse_rss_item_datetime(item):
     date_text = (
         item.findtext("pubDate")
         or item.findtext("{*}pubDate")
@@ -96,18 +725,21 @@ def parse_rss_item_date(item):
     date_text = date_text.strip()
     if not date_text:
         return None
-    try:
-        return datetime.fromisoformat(date_text).date()
-    except ValueError:
-        pass
-    try:
-        return parsedate_to_datetime(date_text).date()
-    except Exception:
-        pass
+    from email.utils import parsedate_to_datetime
+
+    # RSS pubDate is RFC 822, so try that first unless the text looks ISO.
+    parsers = (datetime.fromisoformat, parsedate_to_datetime)
+    if date_text[4:5] != "-":
+        parsers = parsers[::-1]
+    for parse in parsers:
+        try:
+            return parse(date_text)
+        except Exception:
+            pass
     match = re.search(r"\d{4}-\d{2}-\d{2}", date_text)
     if match:
         try:
-            return date_type.fromisoformat(match.group(0))
+            return datetime.fromisoformat(match.group(0))
         except ValueError:
             return None
     return None
@@ -119,6 +751,10 @@ def extract_json_ld_article(html_text):
         html_text,
         flags=re.IGNORECASE | re.DOTALL,
     )
+    return parse_json_ld_scripts(scripts)
+
+
+def parse_json_ld_scripts(scripts):
     for script in scripts:
         script = script.strip()
         if not script:
@@ -212,16 +848,18 @@ class ArticleTextExtractor(HTMLParser):
 
 
 class NewsletterMinuteExtractor(HTMLParser):
-    TARGET_CLASS = "wp-block-dn-newsletter-r5m-minute"
+    TARGET_CLASS = NEWSLETTER_SOURCES[DEFAULT_SOURCE]["minute_class"]
 
-    def __init__(self):
+    def __init__(self, target_class=TARGET_CLASS):
         super().__init__()
+        self.target_class = target_class
         self.capture_depth = 0
         self.ignore_depth = 0
         self.items = []
         self.current = ""
         self.current_lines = []
         self.current_bullets = []
+        self.current_links = []
         self.in_bullet = False
 
     def handle_starttag(self, tag, attrs):
@@ -236,6 +874,11 @@ class NewsletterMinuteExtractor(HTMLParser):
             self.capture_depth = 1
         else:
             return
+        if tag == "a":
+            href = dict(attrs).get("href") or ""
+            if href.startswith(("https://", "http://")):
+                if href not in self.current_links:
+                    self.current_links.append(href)
         if tag in ("p", "br", "h1", "h2", "h3", "h4", "ul"):
             self.flush_line()
         if tag == "li":
@@ -279,30 +922,35 @@ class NewsletterMinuteExtractor(HTMLParser):
         self.flush_line()
         if self.current_lines or self.current_bullets:
             item_text = "\n".join(self.current_lines).strip()
-            self.items.append(
-                {"text": item_text, "bullets": list(self.current_bullets)}
-            )
+            item = {"text": item_text, "bullets": list(self.current_bullets)}
+            if self.current_links:
+                item["links"] = list(self.current_links)
+            self.items.append(item)
         self.current_lines = []
         self.current_bullets = []
+        self.current_links = []
         self.in_bullet = False
 
     def _has_target_class(self, attrs):
         for key, value in attrs:
             if key == "class" and value:
                 classes = value.split()
-                return self.TARGET_CLASS in classes
+                return self.target_class in classes
         return False
 
 
 class NewsletterGroupExtractor(HTMLParser):
-    TARGET_CLASS = "wp-block-dn-newsletter-r5m-group"
+    TARGET_CLASS = NEWSLETTER_SOURCES[DEFAULT_SOURCE]["group_class"]
 
-    def __init__(self):
+    def __init__(self, target_class=TARGET_CLASS, max_chars=EXTRACT_MAX_CHARS):
         super().__init__()
+        self.target_class = target_class
+        self.max_chars = max_chars
         self.capture_depth = 0
         self.ignore_depth = 0
         self.groups = []
         self.current = []
+        self.current_chars = 0
 
     def handle_starttag(self, tag, attrs):
         if tag in ("script", "style", "nav", "footer", "header"):
@@ -312,16 +960,18 @@ class NewsletterGroupExtractor(HTMLParser):
             return
         if self.capture_depth:
             self.capture_depth += 1
-            self.current.append(self.get_starttag_text())
+            self._append(self.get_starttag_text())
             return
         if tag == "div" and self._has_target_class(attrs):
             self.capture_depth = 1
-            self.current = [self.get_starttag_text()]
+            self.current = []
+            self.current_chars = 0
+            self._append(self.get_starttag_text())
 
     def handle_startendtag(self, tag, attrs):
         if self.ignore_depth or not self.capture_depth:
             return
-        self.current.append(self.get_starttag_text())
+        self._append(self.get_starttag_text())
 
     def handle_endtag(self, tag):
         if tag in ("script", "style", "nav", "footer", "header"):
@@ -329,7 +979,7 @@ class NewsletterGroupExtractor(HTMLParser):
             return
         if self.ignore_depth or not self.capture_depth:
             return
-        self.current.append(f"</{tag}>")
+        self._append(f"</{tag}>")
         self.capture_depth = max(0, self.capture_depth - 1)
         if self.capture_depth == 0 and self.current:
             self.groups.append("".join(self.current))
@@ -338,18 +988,251 @@ class NewsletterGroupExtractor(HTMLParser):
     def handle_data(self, data):
         if self.ignore_depth or not self.capture_depth:
             return
-        self.current.append(data)
+        self._append(data)
+
+    def _append(self, fragment):
+        # A runaway group keeps its structure tracked but stops growing.
+        self.current_chars += len(fragment)
+        if self.max_chars is None or self.current_chars <= self.max_chars:
+            self.current.append(fragment)
 
     def _has_target_class(self, attrs):
         for key, value in attrs:
             if key == "class" and value:
                 classes = value.split()
-                return self.TARGET_CLASS in classes
+                return self.target_class in classes
+        return False
+
+
+class ArticlePageExtractor(HTMLParser):
+    """Collect title, JSON-LD, newsletter minutes and fallback text in one pass.
+
+    Mirrors what `NewsletterGroupExtractor` + `NewsletterMinuteExtractor`
+    (first group, then whole page) + `ArticleTextExtractor` produce, but
+    tokenizes the page only once.
+
+    The page can be fed in chunks as it downloads. Text split across chunks
+    is joined again before it reaches the sub-extractors, so the result does
+    not depend on chunk boundaries. Once the time budget, the captured text
+    or the item count runs out, further input is ignored and the result is
+    whatever was extracted so far; `stopped` says why.
+    """
+
+    IGNORED_TAGS = ("script", "style", "nav", "footer", "header")
+
+    def __init__(
+        self,
+        source=None,
+        budget=EXTRACT_BUDGET_SECONDS,
+        max_chars=EXTRACT_MAX_CHARS,
+        max_items=EXTRACT_MAX_ITEMS,
+    ):
+        super().__init__()
+        self.deadline = time.monotonic() + budget if budget else None
+        self.max_chars = max_chars
+        self.max_items = max_items
+        self.captured_chars = 0
+        self.stopped = None
+        self.pending_data = []
+        source = source or NEWSLETTER_SOURCES[DEFAULT_SOURCE]
+        self.group_class = source["group_class"]
+        self.extra_marker = source["extra_marker"]
+        self.title_parts = None
+        self.title_text = None
+        self.json_ld_current = None
+        self.json_ld_scripts = []
+        self.group_depth = 0
+        self.group_ignore_depth = 0
+        self.group_done = False
+        self.group_minutes = NewsletterMinuteExtractor(source["minute_class"])
+        self.group_items = []
+        self.page_minutes = NewsletterMinuteExtractor(source["minute_class"])
+        self.article_text = ArticleTextExtractor()
+
+    def feed(self, data):
+        if self.stopped:
+            return
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.stopped = "time budget"
+            return
+        super().feed(data)
+        items = max(len(self.group_minutes.items), len(self.page_minutes.items))
+        if self.max_items is not None and items > self.max_items:
+            self.stopped = "item limit"
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_data()
+        if self.stopped:
+            return
+        if tag == "title" and self.title_text is None and self.title_parts is None:
+            self.title_parts = []
+        elif tag == "script" and self._is_json_ld(attrs):
+            self.json_ld_current = []
+        self._group_starttag(tag, attrs)
+        self.page_minutes.handle_starttag(tag, attrs)
+        self.article_text.handle_starttag(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_data()
+        if self.stopped:
+            return
+        if self._group_capturing():
+            self.group_minutes.handle_startendtag(tag, attrs)
+        self.page_minutes.handle_startendtag(tag, attrs)
+        self.article_text.handle_startendtag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self._flush_data()
+        if self.stopped:
+            return
+        if tag == "title" and self.title_parts is not None:
+            self.title_text = "".join(self.title_parts)
+            self.title_parts = None
+        elif tag == "script" and self.json_ld_current is not None:
+            self.json_ld_scripts.append("".join(self.json_ld_current))
+            self.json_ld_current = None
+        self._group_endtag(tag)
+        self.page_minutes.handle_endtag(tag)
+        self.article_text.handle_endtag(tag)
+
+    def handle_data(self, data):
+        self.pending_data.append(data)
+
+    def handle_comment(self, data):
+        self._flush_data()
+
+    def handle_decl(self, decl):
+        self._flush_data()
+
+    def handle_pi(self, data):
+        self._flush_data()
+
+    def unknown_decl(self, data):
+        self._flush_data()
+
+    def _flush_data(self):
+        # Text is handed over per run between two markup events, exactly as
+        # when the whole page is fed at once.
+        if not self.pending_data:
+            return
+        data = "".join(self.pending_data)
+        self.pending_data = []
+        if self.stopped:
+            return
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+        if self.json_ld_current is not None:
+            self.json_ld_current.append(data)
+        capturing = self._group_capturing()
+        if capturing:
+            self.group_minutes.handle_data(data)
+        self.page_minutes.handle_data(data)
+        self.article_text.handle_data(data)
+        if (
+            capturing
+            or self.page_minutes.capture_depth
+            or self.article_text.capture_stack
+        ):
+            self.captured_chars += len(data)
+            if self.max_chars is not None and self.captured_chars > self.max_chars:
+                self.stopped = "text limit"
+
+    def _group_capturing(self):
+        return bool(self.group_depth) and not self.group_ignore_depth
+
+    def _group_starttag(self, tag, attrs):
+        if self.group_done:
+            return
+        if tag in self.IGNORED_TAGS:
+            self.group_ignore_depth += 1
+            return
+        if self.group_ignore_depth:
+            return
+        if self.group_depth:
+            self.group_depth += 1
+        elif tag == "div" and self._has_class(attrs, self.group_class):
+            self.group_depth = 1
+        else:
+            return
+        self.group_minutes.handle_starttag(tag, attrs)
+
+    def _group_endtag(self, tag):
+        if self.group_done:
+            return
+        if tag in self.IGNORED_TAGS:
+            self.group_ignore_depth = max(0, self.group_ignore_depth - 1)
+            return
+        if self.group_ignore_depth or not self.group_depth:
+            return
+        self.group_minutes.handle_endtag(tag)
+        self.group_depth -= 1
+        if self.group_depth == 0:
+            self.group_minutes.flush_item()
+            self.group_items = self.group_minutes.items
+            self.group_done = True
+
+    def minutes(self):
+        if self.stopped and self.group_depth and not self.group_done:
+            self.group_minutes.flush_item()
+            self.group_items = self.group_minutes.items
+        items = [
+            item for item in self.group_items if item.get("text") or item.get("bullets")
+        ]
+        if self.extra_marker:
+            self.page_minutes.flush_item()
+            items.extend(
+                item
+                for item in self.page_minutes.items
+                if self.extra_marker in item.get("text")
+            )
+        return items
+
+    def title(self):
+        if self.title_text is None:
+            return None
+        return clean_title(html.unescape(self.title_text))
+
+    def text(self):
+        self.article_text.flush_line()
+        return "\n".join(self.article_text.lines).strip()
+
+    def page(self):
+        self._flush_data()
+        return {
+            "title": self.title(),
+            "json_ld": parse_json_ld_scripts(self.json_ld_scripts),
+            "minutes": self.minutes(),
+            "text": self.text(),
+        }
+
+    @staticmethod
+    def _is_json_ld(attrs):
+        for key, value in attrs:
+            if key == "type" and value:
+                return value.lower() == "application/ld+json"
+        return False
+
+    @staticmethod
+    def _has_class(attrs, target_class):
+        for key, value in attrs:
+            if key == "class" and value:
+                return target_class in value.split()
         return False
 
 
-def extract_newsletter_groups(html_text, limit=None):
-    extractor = NewsletterGroupExtractor()
+def parse_article_page(html_text, source=None):
+    extractor = ArticlePageExtractor(source)
+    for chunk in iter_text_chunks(html_text):
+        extractor.feed(chunk)
+    return extractor.page()
+
+
+def extract_newsletter_groups(html_text, limit=None, source=None):
+    extractor = (
+        NewsletterGroupExtractor(source["group_class"])
+        if source
+        else NewsletterGroupExtractor()
+    )
     extractor.feed(html_text)
     groups = extractor.groups
     if limit is None:
@@ -363,37 +1246,20 @@ def extract_newsletter_groups(html_text, limit=None):
     return groups[:limit]
 
 
-def extract_newsletter_minutes(html_text):
-    groups = extract_newsletter_groups(html_text, limit=1)
-    items = []
-    if groups:
-        for group_html in groups:
-            extractor = NewsletterMinuteExtractor()
-            extractor.feed(group_html)
-            extractor.flush_item()
-            items.extend(extractor.items)
-
-    extractor = NewsletterMinuteExtractor()
-    extractor.feed(html_text)
-    extractor.flush_item()
-    all_items = extractor.items
+def extract_newsletter_minutes(html_text, source=None):
+    return parse_article_page(html_text, source)["minutes"]
 
-    items = [item for item in items if item.get("text") or item.get("bullets")]
-    items.extend([item for item in all_items if "Počasí" in item.get("text")])
-    return items
 
+def extract_article_text(html_text, source=None):
+    return article_text_from_page(parse_article_page(html_text, source), html_text)
 
-def extract_article_text(html_text):
-    minutes = extract_newsletter_minutes(html_text)
-    if minutes:
-        return minutes
-    extractor = ArticleTextExtractor()
-    extractor.feed(html_text)
-    extractor.flush_line()
-    text = "\n".join(extractor.lines).strip()
-    if text:
-        return text
-    return fallback_strip_html(html_text)
+
+def article_text_from_page(page, html_text):
+    if page["minutes"]:
+        return page["minutes"]
+    if page["text"]:
+        return page["text"]
+    return fallback_strip_html(html_text[:EXTRACT_MAX_CHARS])
 
 
 def fallback_strip_html(html_text):
@@ -403,10 +1269,10 @@ def fallback_strip_html(html_text):
         html_text,
         flags=re.IGNORECASE,
     )
-    normalized = re.sub(r"<br\\s*/?>", "\n", normalized, flags=re.IGNORECASE)
+    normalized = re.sub(r"<br\s*/?>", "\n", normalized, flags=re.IGNORECASE)
     normalized = re.sub(r"<[^>]+>", " ", normalized)
     normalized = html.unescape(normalized)
-    normalized = re.sub(r"[ \\t\\r]+", " ", normalized)
+    normalized = re.sub(r"[ \t\r]+", " ", normalized)
     lines = [line.strip() for line in normalized.split("\n")]
     lines = [line for line in lines if line]
     return "\n".join(lines).strip()
@@ -416,203 +1282,2747 @@ def extract_title(html_text):
     match = re.search(r"<title[^>]*>(.*?)</title>", html_text, flags=re.I | re.S)
     if not match:
         return None
-    title = html.unescape(match.group(1)).strip()
+    return clean_title(html.unescape(match.group(1)))
+
+
+def clean_title(title):
+    title = title.strip()
     title = re.sub(r"\s+[-|–]\s+.*$", "", title)
     return title.strip()
 
 
-def fetch_article(url):
-    response = http_get(url)
-    html_text = response.text
-    payload = extract_json_ld_article(html_text) or {}
-    title = extract_title(html_text) or "Daily overview"
-    date = payload.get("date")
-    extracted = extract_article_text(html_text)
-    items = []
-    body = ""
-    if isinstance(extracted, list):
-        items = []
-        for item in extracted:
-            if isinstance(item, dict):
-                text = (item.get("text") or "").strip()
-                bullets = [b.strip() for b in item.get("bullets") or [] if b.strip()]
-                items.append({"text": text, "bullets": bullets})
-            else:
-                items.append({"text": str(item).strip(), "bullets": []})
-        body = "\n\n".join(
-            filter(None, [item["text"] for item in items if item.get("text")])
-        ).strip()
-    else:
-        body = extracted or ""
-    if not body and not items:
-        body = "No article text found."
+def newsletter_source(
+    key,
+    feed_url,
+    title=None,
+    group_class=None,
+    minute_class=None,
+    extra_marker=None,
+    layout=TYPST_DEFAULT_LAYOUT,
+):
+    """Registry entry: where a newsletter's feed is and how to extract it."""
+    if layout not in TYPST_LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r} for source {key}.")
     return {
-        "url": url,
-        "title": title,
-        "date": date,
-        "body": body,
-        "items": items,
+        "key": key,
+        "title": title or key,
+        "feed_url": feed_url,
+        "group_class": group_class,
+        "minute_class": minute_class,
+        "extra_marker": extra_marker,
+        "layout": layout,
     }
 
 
-def escape_typst_text(text):
-    replacements = {
-        "\\": "\\\\",
-        "*": "\\*",
-        "_": "\\_",
-        "#": "\\#",
-        "[": "\\[",
-        "]": "\\]",
-        "{": "\\{",
-        "}": "\\}",
-    }
-    for key, value in replacements.items():
-        text = text.replace(key, value)
-    return text
+def load_newsletter_sources(path):
+    """Read `[[source]]` tables (key, feed_url, title, ...) from TOML."""
+    import tomllib
 
+    with open(path, "rb") as handle:
+        config = tomllib.load(handle)
+    sources = {}
+    for entry in config.get("source", []):
+        name = entry.get("key", "without a key")
+        for field in entry:
+            if field not in SOURCE_FIELDS:
+                raise ValueError(
+                    f"Unknown key {field!r} for source {name} in {path}; "
+                    f"allowed: {', '.join(SOURCE_FIELDS)}."
+                )
+        for field in ("key", "feed_url"):
+            if field not in entry:
+                raise ValueError(f"Source {name} in {path} needs {field!r}.")
+        sources[entry["key"]] = newsletter_source(**entry)
+    return sources
 
-def escape_typst_link_target(text):
-    return text.replace("\\", "\\\\").replace('"', '\\"')
 
+def article_source(article):
+    return source_for_key(article.get("source"))
 
-def extract_date_only(date_value):
-    if not date_value:
-        return None
-    if isinstance(date_value, datetime):
-        return date_value.date().isoformat()
-    if isinstance(date_value, date_type):
-        return date_value.isoformat()
-    if isinstance(date_value, str):
-        text = date_value.strip()
-        if not text:
-            return None
-        match = re.search(r"(\\d{4}-\\d{2}-\\d{2})", text)
-        if match:
-            return match.group(1)
-        if text.endswith("Z"):
-            text = text[:-1] + "+00:00"
-        try:
-            parsed = datetime.fromisoformat(text)
-        except ValueError:
-            return None
-        return parsed.date().isoformat()
-    return None
 
+def source_for_key(key):
+    key = key or DEFAULT_SOURCE
+    return NEWSLETTER_SOURCES.get(key) or newsletter_source(key, None)
 
-def czech_weekday(date_value):
-    if not date_value:
-        return None
-    if isinstance(date_value, (datetime, date_type)):
-        day_index = date_value.weekday()
-    elif isinstance(date_value, str):
-        text = date_value.strip()
-        if not text:
-            return None
-        if text.endswith("Z"):
-            text = text[:-1] + "+00:00"
-        try:
-            parsed = datetime.fromisoformat(text)
-        except ValueError:
-            match = re.search(r"(\\d{4}-\\d{2}-\\d{2})", text)
-            if not match:
-                return None
-            try:
-                parsed = datetime.fromisoformat(match.group(1))
-            except ValueError:
-                return None
-        day_index = parsed.weekday()
+
+def fetch_article(url, cache=None, offline=False, source=None):
+    source = source or NEWSLETTER_SOURCES[DEFAULT_SOURCE]
+    entry = cache.get(url) if cache else None
+    cached = entry.get("article") if entry else None
+    if cached and cached.get("source", DEFAULT_SOURCE) != source["key"]:
+        cached = None
+    if cached and (offline or cache.is_fresh(entry)):
+        return cached
+    if offline:
+        html_text = cache.body(entry) if entry else None
+        if html_text is None:
+            raise CacheMissError(f"{url} is not in the cache.")
+        article = parse_article(url, html_text, source)
+        entry["article"] = article
+        cache.save(url, entry)
+        return article
+
+    page = stopped = None
+    with PROFILER.stage("article_fetch", url=url) as record:
+        headers = cache.validators(entry) if entry else None
+        with http_stream(url, headers=headers) as response:
+            record["status"] = response.status_code
+            if response.status_code != 304:
+                page, stopped = stream_article_page(response, source)
+            record["bytes"] = len(response.content)
+        if stopped:
+            record["stopped"] = stopped
+    unchanged = entry is not None and (
+        response.status_code == 304 or cache.same_body(entry, response)
+    )
+    if unchanged and cached:
+        cache.touch(url, entry)
+        return cached
+    if page is None:
+        html_text = cache.body(entry)
+        if html_text is None:
+            response = http_get(url)
+            html_text = response.text
+        article = parse_article(url, html_text, source)
+    else:
+        with PROFILER.stage("extract", url=url, bytes=len(response.content)) as record:
+            html_text = None
+            if not page["minutes"] and not page["text"]:
+                html_text = response.text
+            article = article_from_page(url, page, html_text, source)
+            record["items"] = len(article["items"])
+    if stopped:
+        # A partial body must not pass for the page on the next run.
+        print(f"Extraction of {url} stopped ({stopped}); the issue may be incomplete.")
+        return article
+    if cache:
+        if response.status_code == 304:
+            entry["article"] = article
+            cache.touch(url, entry)
+        else:
+            cache.put(url, response, article)
+    return article
+
+
+def stream_article_page(response, source=None, max_bytes=ARTICLE_MAX_BYTES):
+    """Parse a page while it downloads, within ARTICLE_MAX_BYTES and the budget.
+
+    Returns the parsed page and why extraction stopped early (None when the
+    whole body was read). The bytes read are left in `response.content`.
+    """
+    extractor = ArticlePageExtractor(source)
+    try:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")
+    decoder = decoder(errors="replace")
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(HTTP_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            extractor.stopped = "size limit"
+            break
+        chunks.append(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.stopped:
+            break
+    else:
+        extractor.feed(decoder.decode(b"", final=True))
+    response._content = b"".join(chunks)
+    return extractor.page(), extractor.stopped
+
+
+class StoryLedeExtractor(HTMLParser):
+    """Description meta tag, or else the first paragraph of the article."""
+
+    def __init__(self):
+        super().__init__()
+        self.description = None
+        self.article_depth = 0
+        self.paragraph = None
+        self.first_paragraph = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta" and self.description is None:
+            attributes = dict(attrs)
+            name = attributes.get("name") or attributes.get("property")
+            if name in ("description", "og:description") and attributes.get("content"):
+                self.description = attributes["content"]
+        elif tag in ("article", "main"):
+            self.article_depth += 1
+        elif tag == "p" and self.article_depth and self.first_paragraph is None:
+            self.paragraph = []
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "meta":
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in ("article", "main"):
+            self.article_depth = max(0, self.article_depth - 1)
+        elif tag == "p" and self.paragraph is not None:
+            text = " ".join("".join(self.paragraph).split())
+            self.first_paragraph = text or None
+            self.paragraph = None
+
+    def handle_data(self, data):
+        if self.paragraph is not None:
+            self.paragraph.append(data)
+
+
+def story_lede(html_text, limit=STORY_LEDE_CHARS):
+    extractor = StoryLedeExtractor()
+    extractor.feed(html_text)
+    lede = extractor.description or extractor.first_paragraph
+    if not lede:
+        return None
+    lede = " ".join(html.unescape(lede).split())
+    if len(lede) > limit:
+        lede = lede[:limit].rsplit(" ", 1)[0].rstrip(",.;:") + "…"
+    return lede
+
+
+def fetch_story(url, cache=None, offline=False, timeout=STORY_TIMEOUT_SECONDS):
+    """Lede of a story linked from an item, cached like the issues."""
+    entry = cache.get(url) if cache else None
+    if entry is not None and "lede" not in entry:
+        entry = None
+    if entry and (offline or cache.is_fresh(entry)):
+        return entry["lede"]
+    if offline:
+        raise CacheMissError(f"{url} is not in the cache.")
+    with PROFILER.stage("story_fetch", url=url) as record:
+        response = http_get(
+            url, timeout=timeout, headers=cache.validators(entry) if entry else None
+        )
+        record["status"] = response.status_code
+        record["bytes"] = len(response.content)
+    if response.status_code == 304 and entry:
+        cache.touch(url, entry)
+        return entry["lede"]
+    lede = story_lede(response.text)
+    if cache:
+        entry = cache.put(url, response)
+        entry["lede"] = lede
+        cache.save(url, entry)
+    return lede
+
+
+class StoryPrefetch:
+    """Linked stories of an issue, fetched while the issue is printed.
+
+    The first link of every item is fetched concurrently over the shared
+    session from the moment the prefetch is created. article() is the issue
+    with the ledes that are in so far and never waits, so the base print is
+    not held up; finish() waits out the rest of the `budget`, abandons
+    whatever is still not in and returns the issue with the ledes it got.
+    The workers are daemon threads: a story still loading does not keep the
+    process from exiting either.
+    """
+
+    def __init__(
+        self,
+        article,
+        cache=None,
+        offline=False,
+        budget=STORY_BUDGET_SECONDS,
+        workers=STORY_WORKERS,
+    ):
+        self.source_article = article
+        self.cache = cache
+        self.offline = offline
+        self.deadline = time.monotonic() + budget
+        items = article.get("items") or []
+        self.stories = [
+            item["links"][0] if item.get("links") else None for item in items
+        ]
+        self.pending = deque(
+            dict.fromkeys(
+                url
+                for url, item in zip(self.stories, items)
+                if url and not item.get("lede")
+            )
+        )
+        self.items = len(self.pending)
+        self.remaining = len(self.pending)
+        self.ledes = {}
+        # Ledes in the article() last handed out and the ones finish() got.
+        self.shown = 0
+        self.fetched = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.pending:
+            self.finished.set()
+        for _ in range(min(workers, len(self.pending))):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return
+                url = self.pending.popleft()
+            try:
+                lede = fetch_story(url, self.cache, self.offline)
+            except Exception:
+                lede = None
+            with self.lock:
+                if lede:
+                    self.ledes[url] = lede
+                self.remaining -= 1
+                if not self.remaining:
+                    self.finished.set()
+
+    def article(self):
+        """The issue with the ledes fetched so far."""
+        with self.lock:
+            ledes = dict(self.ledes)
+        self.shown = len(ledes)
+        return self._enriched(ledes)
+
+    def finish(self):
+        """Wait out the budget; the issue with every lede that made it."""
+        with PROFILER.stage("stories", items=self.items) as record:
+            self.finished.wait(max(0, self.deadline - time.monotonic()))
+            with self.lock:
+                # Workers stop after their current story instead of fetching
+                # the rest in the background.
+                self.pending.clear()
+                ledes = dict(self.ledes)
+            record["fetched"] = self.fetched = len(ledes)
+        return self._enriched(ledes)
+
+    def _enriched(self, ledes):
+        enriched = []
+        for item, url in zip(self.source_article.get("items") or [], self.stories):
+            if url:
+                item = {**item, "story": url}
+                if url in ledes:
+                    item["lede"] = ledes[url]
+            enriched.append(item)
+        return {**self.source_article, "items": enriched}
+
+
+def finish_stories(prefetch, sinks=(), render=None):
+    """Hand an issue on once its stories are in, after the base print.
+
+    `render` recompiles the kept PDF when ledes came in after the print.
+    """
+    article = prefetch.finish()
+    try:
+        for sink in sinks:
+            sink(article)
+        if render is not None and prefetch.fetched > prefetch.shown:
+            render(article)
+    except Exception as exc:
+        print(f"Adding the stories to {article.get('url')} failed: {exc}")
+    return article
+
+
+def parse_article(url, html_text, source=None):
+    with PROFILER.stage("extract", url=url, chars=len(html_text)) as record:
+        article = build_article(url, html_text, source)
+        record["items"] = len(article["items"])
+    return article
+
+
+def build_article(url, html_text, source=None):
+    source = source or NEWSLETTER_SOURCES[DEFAULT_SOURCE]
+    return article_from_page(
+        url, parse_article_page(html_text, source), html_text, source
+    )
+
+
+def article_from_page(url, page, html_text, source=None):
+    """Article dict from a parsed page; `html_text` is only read as a fallback."""
+    source = source or NEWSLETTER_SOURCES[DEFAULT_SOURCE]
+    payload = page["json_ld"] or {}
+    title = page["title"] or "Daily overview"
+    date = payload.get("date")
+    extracted = article_text_from_page(page, html_text)
+    items = []
+    body = ""
+    if isinstance(extracted, list):
+        items = []
+        for item in extracted:
+            if isinstance(item, dict):
+                # Extractor lines are already stripped and never empty.
+                text = item.get("text") or ""
+                items.append({"text": text, "bullets": list(item.get("bullets") or [])})
+                if item.get("links"):
+                    items[-1]["links"] = item["links"]
+            else:
+                items.append({"text": str(item).strip(), "bullets": []})
+        body = "\n\n".join(
+            filter(None, [item["text"] for item in items if item.get("text")])
+        ).strip()
     else:
+        body = extracted or ""
+    if not body and not items:
+        body = "No article text found."
+    return {
+        "url": url,
+        "title": title,
+        "date": date,
+        "body": body,
+        "items": items,
+        "source": source["key"],
+    }
+
+
+class Item:
+    """One item of an issue; `typst` is its heading and bullets, escaped once."""
+
+    __slots__ = ("text", "bullets", "links", "story", "lede", "typst")
+
+    def __init__(self, text="", bullets=(), links=(), story=None, lede=None):
+        self.text = text
+        self.bullets = bullets
+        self.links = links
+        self.story = story
+        self.lede = lede
+        # Escaping is per character and "\n- " has nothing to escape, so the
+        # whole block goes through escape_typst_text in one call.
+        self.typst = escape_typst_text(
+            "\n- ".join(
+                [text.strip() or "Item", *(b.strip() for b in bullets if b.strip())]
+            )
+        )
+
+    @classmethod
+    def from_dict(cls, item):
+        get = item.get
+        return cls(
+            get("text") or "",
+            get("bullets") or (),
+            get("links") or (),
+            get("story"),
+            get("lede"),
+        )
+
+    def as_dict(self):
+        item = {"text": self.text, "bullets": list(self.bullets)}
+        if self.links:
+            item["links"] = list(self.links)
+        if self.story:
+            item["story"] = self.story
+        if self.lede:
+            item["lede"] = self.lede
+        return item
+
+
+class Issue:
+    """A parsed issue as renderers and exporters use it.
+
+    Built once from the article dict that extraction, the cache, the archive
+    and the relay pass around: the date is parsed to `day` and `weekday`, and
+    the title and items are escaped for Typst, so rendering does neither.
+    """
+
+    __slots__ = (
+        "url",
+        "title",
+        "date",
+        "day",
+        "weekday",
+        "body",
+        "items",
+        "source",
+        "typst_title",
+    )
+
+    def __init__(
+        self, url, title=None, date=None, body="", items=(), source=DEFAULT_SOURCE
+    ):
+        self.url = url
+        self.title = title
+        self.date = date
+        self.day = issue_day(date)
+        self.weekday = CZECH_WEEKDAYS[self.day.weekday()] if self.day else None
+        self.body = body or ""
+        self.items = items
+        self.source = source or DEFAULT_SOURCE
+        self.typst_title = escape_typst_text(title or "Daily overview")
+
+    @classmethod
+    def from_article(cls, article):
+        return cls(
+            article.get("url"),
+            article.get("title"),
+            article.get("date"),
+            article.get("body"),
+            [Item.from_dict(item) for item in article.get("items") or ()],
+            article.get("source"),
+        )
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "title": self.title,
+            "date": self.date,
+            "body": self.body,
+            "items": [item.as_dict() for item in self.items],
+            "source": self.source,
+        }
+
+
+def as_issue(article):
+    """`Issue` for an article dict; an `Issue` is returned as is."""
+    if isinstance(article, Issue):
+        return article
+    return Issue.from_article(article)
+
+
+def escape_typst_text(text):
+    if TYPST_TEXT_SPECIAL.search(text) is None:
+        return text
+    for key, value in TYPST_TEXT_ESCAPES:
+        text = text.replace(key, value)
+    return text
+
+
+def escape_typst_link_target(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def issue_day(date_value):
+    """Calendar day of a date, datetime or ISO string, as written (no tz shift)."""
+    if not date_value:
+        return None
+    if isinstance(date_value, datetime):
+        return date_value.date()
+    if isinstance(date_value, date_type):
+        return date_value
+    if not isinstance(date_value, str):
+        return None
+    text = date_value.strip()
+    match = ISO_DATE.search(text)
+    if match:
+        try:
+            return date_type.fromisoformat(match.group(1))
+        except ValueError:
+            pass
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
         return None
-    names = [
-        "pondělí",
-        "úterý",
-        "středa",
-        "čtvrtek",
-        "pátek",
-        "sobota",
-        "neděle",
+
+
+def extract_date_only(date_value):
+    day = issue_day(date_value)
+    return day.isoformat() if day else None
+
+
+def czech_weekday(date_value):
+    day = issue_day(date_value)
+    return CZECH_WEEKDAYS[day.weekday()] if day else None
+
+
+def typst_layout_module():
+    """Static part of every issue: packages, page layouts and helpers."""
+    layouts = "\n".join(
+        f'  "{name}": (page: {page}, size: {size}),'
+        for name, (page, size, _) in TYPST_LAYOUTS.items()
+    )
+    return f"""#import "{TYPST_QR_PACKAGE}": qr-code
+
+#let layouts = (
+{layouts}
+)
+
+#let separator(
+  width: 60%,
+  stroke: 0.5pt,
+  top-gap: 0.1em,
+  bottom-gap: 0.1em,
+) = {{
+  v(top-gap)
+  align(center)[
+    #line(length: width, stroke: stroke)
+  ]
+  v(bottom-gap)
+}}
+
+#let issue(
+  layout: "{TYPST_DEFAULT_LAYOUT}",
+  name: none,
+  weekday: none,
+  date: none,
+  body,
+) = {{
+  let settings = layouts.at(layout)
+  set page(
+    ..settings.page,
+    footer: context [
+      *#name#for part in (weekday, date).filter(part => part != none) [ -- #part]*
+      #h(1fr)
+      #counter(page).display(
+        "1/1",
+        both: true,
+      )
+    ],
+  )
+  set columns(gutter: 12pt)
+  set text(
+    font: "{TYPST_FONT}",
+    size: settings.size,
+  )
+  body
+}}
+"""
+
+
+_written_layout_modules = set()
+
+
+def write_layout_module(directory):
+    """Write the layout module next to the issues unless it is current."""
+    path = os.path.join(directory, TYPST_LAYOUT_MODULE)
+    if path in _written_layout_modules and os.path.exists(path):
+        return path
+    source = typst_layout_module()
+    try:
+        with open(path, encoding="utf-8") as handle:
+            current = handle.read()
+    except OSError:
+        current = None
+    if current != source:
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(source)
+    _written_layout_modules.add(path)
+    return path
+
+
+def standalone_typst(source):
+    """Issue source with the layout module inlined, for compiling from stdin."""
+    header, _, body = source.partition("\n")
+    if not header.startswith(f'#import "{TYPST_LAYOUT_MODULE}"'):
+        return source
+    return typst_layout_module() + body
+
+
+def typst_content(text):
+    return f"[{escape_typst_text(text)}]" if text else "none"
+
+
+def typst_header(layout, name, weekday=None, date=None):
+    return [
+        f'#import "{TYPST_LAYOUT_MODULE}": issue, qr-code, separator',
+        f'#show: issue.with(layout: "{layout}", name: {typst_content(name)}, '
+        f"weekday: {typst_content(weekday)}, date: {typst_content(date)})",
+        "",
+    ]
+
+
+def typst_issue_lines(issue):
+    """Heading, items and source of one issue, without the document header."""
+    lines = [f"= {issue.typst_title}"]
+    if issue.date:
+        published = escape_typst_text(issue.date)
+        if issue.weekday:
+            published += f", {issue.weekday}"
+        lines.append(f"_Vydáno: {published}_")
+    lines.append("")
+
+    if issue.items:
+        last = len(issue.items) - 1
+        for index, item in enumerate(issue.items):
+            lines.append(item.typst)
+            if item.story:
+                lines.append(typst_story(item.story, item.lede))
+            if index < last:
+                lines.append("")
+            lines.append("#separator()")
+        target = escape_typst_link_target(issue.url)
+        lines.append(f'_Zdroj: #link("{target}")_')
+        lines.append(f'#qr-code("{target}", width: 2cm)')
+        lines.append("")
+        return lines
+
+    for line in issue.body.splitlines():
+        lines.append(escape_typst_text(line))
+    return lines
+
+
+def typst_story(url, lede=None):
+    """Lede (or just a link) of an item's story beside its QR code."""
+    target = escape_typst_link_target(url)
+    caption = (
+        f"_{escape_typst_text(lede)}_" if lede else f'#link("{target}")[Celý článek]'
+    )
+    return (
+        "#grid(columns: (1fr, 1.5cm), column-gutter: 6pt, align: horizon, "
+        f'[{caption}], qr-code("{target}", width: 1.5cm))'
+    )
+
+
+def format_typst(article, layout=None):
+    issue = as_issue(article)
+    source = source_for_key(issue.source)
+    lines = typst_header(
+        layout or source["layout"], source["title"], issue.weekday, issue.date
+    )
+    lines.extend(typst_issue_lines(issue))
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def format_typst_digest(articles, layout=None):
+    """One document with a section per issue, in the given order."""
+    issues = [as_issue(article) for article in articles]
+    days = [issue.day.isoformat() if issue.day else "?" for issue in issues]
+    period = days[0] if len(set(days)) == 1 else f"{days[0]} – {days[-1]}"
+    sources = [
+        source_for_key(key) for key in dict.fromkeys(issue.source for issue in issues)
+    ]
+    lines = typst_header(
+        layout or sources[0]["layout"],
+        ", ".join(source["title"] for source in sources),
+        date=period,
+    )
+    for issue in issues:
+        lines.extend(typst_issue_lines(issue))
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def wait_for_overview_url(poller, target_date, poll=False, timeout_minutes=None):
+    if timeout_minutes is None:
+        timeout_minutes = POLL_TIMEOUT_MINUTES
+    poll_deadline = datetime.now() + timedelta(minutes=timeout_minutes)
+    while True:
+        try:
+            return poller.fetch_overview_url(target_date=target_date)
+        except DateNotAvailableError:
+            if not poll:
+                raise
+            delay = next_poll_delay(datetime.now(), poller.publish_times, poll_deadline)
+            if delay is None:
+                raise
+            print(
+                f"Date {target_date.isoformat()} not yet available; "
+                f"retrying in {delay:.0f}s..."
+            )
+            time.sleep(delay)
+
+
+def issue_output_path(article, layout=None):
+    issue = as_issue(article)
+    source = source_for_key(issue.source)
+    date_only = issue.day.isoformat() if issue.day else "unknown-date"
+    suffix = "" if layout in (None, source["layout"]) else f"-{layout}"
+    return f"{source['key']}-{date_only}{suffix}.typ"
+
+
+def typst_issue_document(article, output_path=None, layout=None):
+    """Output path and Typst source for one issue."""
+    issue = as_issue(article)
+    if output_path is None:
+        output_path = issue_output_path(issue, layout)
+    with PROFILER.stage("format_typst") as record:
+        source = format_typst(issue, layout)
+        record["bytes"] = len(source.encode("utf-8"))
+        record["items"] = len(issue.items)
+    return output_path, source
+
+
+def typst_digest_document(articles, output_path=None, layout=None):
+    """Output path and Typst source for a digest of several issues."""
+    issues = [as_issue(article) for article in articles]
+    if output_path is None:
+        first, last = (
+            issue.day.isoformat() if issue.day else "unknown-date"
+            for issue in (issues[0], issues[-1])
+        )
+        output_path = issue_output_path(issues[0], layout).replace(
+            f"-{first}", f"-{first}--{last}", 1
+        )
+    with PROFILER.stage("format_typst") as record:
+        source = format_typst_digest(issues, layout)
+        record["bytes"] = len(source.encode("utf-8"))
+        record["items"] = sum(len(issue.items) for issue in issues)
+    return output_path, source
+
+
+def write_typst(article, output_path=None, layout=None):
+    output_path, source = typst_issue_document(article, output_path, layout)
+    write_typst_source(output_path, source)
+    return output_path
+
+
+def write_typst_digest(articles, output_path=None, layout=None):
+    output_path, source = typst_digest_document(articles, output_path, layout)
+    write_typst_source(output_path, source)
+    return output_path
+
+
+def write_typst_source(output_path, source):
+    write_layout_module(os.path.dirname(os.path.abspath(output_path)))
+    with open(output_path, "w", encoding="utf-8") as handle:
+        handle.write(source)
+
+
+def content_hash(value):
+    """SHA-256 of a JSON-serializable value (e.g. a parsed article)."""
+    return hashlib.sha256(
+        json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def issue_hash(article):
+    """Content hash of an issue, the same whether fetched or archived.
+
+    Story ledes are left out: fetching them (or running out of time doing
+    so) does not make an issue a new one.
+    """
+    issue = {key: value for key, value in article.items() if key != "issue_date"}
+    if issue.get("items"):
+        issue["items"] = [
+            {key: value for key, value in item.items() if key not in ("story", "lede")}
+            for item in issue["items"]
+        ]
+    return content_hash(issue)
+
+
+def stamp_path_for(output_path):
+    return f"{output_path}.stamp"
+
+
+def read_stamp(stamp_path):
+    try:
+        with open(stamp_path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_stamp(stamp_path, stamp):
+    write_atomic(stamp_path, json.dumps(stamp, indent=2).encode("utf-8"))
+
+
+def pdf_path_for(output_path):
+    return (
+        f"{output_path[:-4]}.pdf"
+        if output_path.lower().endswith(".typ")
+        else f"{output_path}.pdf"
+    )
+
+
+class TypstWorkerError(RuntimeError):
+    pass
+
+
+class PreflightError(RuntimeError):
+    pass
+
+
+class TypstAssets:
+    """Vendored Typst packages and fonts passed to every compile.
+
+    `packages/` follows Typst's `{namespace}/{name}/{version}` layout for
+    `--package-path`, `fonts/` is handed over as `--font-path`.
+    """
+
+    PACKAGE_SPEC = re.compile(r"@([a-z0-9-]+)/([a-z0-9-]+):(\d+\.\d+\.\d+)")
+
+    def __init__(self, root=TYPST_ASSETS_DIR):
+        self.root = root
+        self.package_dir = os.path.join(root, "packages")
+        self.font_dir = os.path.join(root, "fonts")
+
+    def typst_args(self):
+        args = []
+        if os.path.isdir(self.package_dir):
+            args.extend(["--package-path", self.package_dir])
+        if os.path.isdir(self.font_dir):
+            args.extend(["--font-path", self.font_dir])
+        return args
+
+    def install(self, font_files=()):
+        """Vendor the QR package with its dependencies and copy fonts."""
+        pending = [TYPST_QR_PACKAGE]
+        seen = set()
+        while pending:
+            spec = pending.pop()
+            if spec in seen:
+                continue
+            seen.add(spec)
+            path = self.vendored_package(spec)
+            if path is None:
+                path = self.download_package(spec)
+                print(f"Installed Typst package {spec}")
+            pending.extend(self.package_dependencies(path))
+        if font_files:
+            os.makedirs(self.font_dir, exist_ok=True)
+            for font_file in font_files:
+                shutil.copy2(font_file, self.font_dir)
+                print(f"Installed font {os.path.basename(font_file)}")
+
+    def download_package(self, spec):
+        namespace, name, version = self.PACKAGE_SPEC.fullmatch(spec).groups()
+        url = TYPST_PACKAGE_URL.format(namespace=namespace, name=name, version=version)
+        response = http_get(url)
+        target = os.path.join(self.package_dir, namespace, name, version)
+        os.makedirs(self.package_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=self.package_dir)
+        try:
+            import tarfile
+
+            with tarfile.open(fileobj=io.BytesIO(response.content), mode="r:gz") as tar:
+                tar.extractall(temp_dir, filter="data")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_dir, target)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return target
+
+    def vendored_package(self, spec):
+        """Local directory of `spec`, vendored or already in Typst's caches."""
+        namespace, name, version = self.PACKAGE_SPEC.fullmatch(spec).groups()
+        roots = [
+            self.package_dir,
+            os.path.join(
+                os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                "typst",
+                "packages",
+            ),
+            os.path.join(
+                os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"),
+                "typst",
+                "packages",
+            ),
+        ]
+        for root in roots:
+            path = os.path.join(root, namespace, name, version)
+            if os.path.isfile(os.path.join(path, "typst.toml")):
+                return path
+        return None
+
+    def package_dependencies(self, path):
+        specs = set()
+        for directory, _, files in os.walk(path):
+            for file_name in files:
+                if not file_name.endswith(".typ"):
+                    continue
+                with open(
+                    os.path.join(directory, file_name), encoding="utf-8"
+                ) as handle:
+                    specs.update(
+                        match.group(0)
+                        for match in self.PACKAGE_SPEC.finditer(handle.read())
+                    )
+        return specs
+
+    def preflight(self, cli=True, strict=True):
+        """Raise PreflightError listing everything a compile would miss.
+
+        `cli` is for backends that run the typst binary; only they need it on
+        PATH and only they get the font check. Without `strict` the missing
+        packages and fonts are printed as a warning instead.
+        """
+        if cli and not shutil.which("typst"):
+            raise PreflightError("typst is not installed or not in PATH.")
+        problems = []
+        pending = [TYPST_QR_PACKAGE]
+        seen = set()
+        while pending:
+            spec = pending.pop()
+            if spec in seen:
+                continue
+            seen.add(spec)
+            path = self.vendored_package(spec)
+            if path is None:
+                problems.append(f"Typst package {spec} is not available offline.")
+            else:
+                pending.extend(self.package_dependencies(path))
+        if cli:
+            fonts_command = ["typst", "fonts"]
+            if os.path.isdir(self.font_dir):
+                fonts_command.extend(["--font-path", self.font_dir])
+            fonts = subprocess.run(
+                fonts_command, capture_output=True, text=True, check=False
+            ).stdout.splitlines()
+            if TYPST_FONT not in (font.strip() for font in fonts):
+                problems.append(f'Font "{TYPST_FONT}" is not installed.')
+        if not problems:
+            return
+        message = (
+            " ".join(problems)
+            + " Run main.py --setup-assets (with --install-font for fonts)."
+        )
+        if strict:
+            raise PreflightError(message)
+        print(f"Warning: {message}")
+
+
+def check_environment(assets, printers_config=PRINTERS_CONFIG_PATH):
+    """Offline self-test for --check; returns (check, ok, detail) rows."""
+    rows = [("python", True, sys.version.split()[0])]
+    for module, required in (
+        ("requests", True),
+        ("urllib3", True),
+        ("brotli", False),
+        ("typst", False),
+    ):
+        found = importlib.util.find_spec(module) is not None
+        if found:
+            detail = "installed"
+        else:
+            detail = "missing" if required else "not installed (optional)"
+        rows.append((module, found or not required, detail))
+    if shutil.which("typst"):
+        version = subprocess.run(
+            ["typst", "--version"], capture_output=True, text=True, check=False
+        ).stdout.strip()
+        rows.append(("typst cli", True, version))
+    try:
+        assets.preflight()
+    except PreflightError as exc:
+        rows.append(("typst assets", False, str(exc)))
+    else:
+        rows.append(("typst assets", True, f"{TYPST_QR_PACKAGE}, {TYPST_FONT}"))
+    if os.path.exists(printers_config):
+        try:
+            targets = load_print_targets(printers_config)
+        except (OSError, ValueError) as exc:
+            rows.append(("printers", False, f"{printers_config}: {exc}"))
+        else:
+            names = ", ".join(target["printer"] or "default" for target in targets)
+            rows.append(("printers", True, names or "none configured"))
+    else:
+        rows.append(("printers", True, "default lpr printer"))
+    return rows
+
+
+class SubprocessTypstCompiler:
+    """Cold `typst compile` per document."""
+
+    def __init__(self, typst_args=()):
+        self.typst_args = list(typst_args)
+
+    def compile(self, input_path, pdf_path):
+        subprocess.run(
+            ["typst", "compile", *self.typst_args, input_path, pdf_path], check=True
+        )
+        return pdf_path
+
+    def compile_bytes(self, source):
+        return subprocess.run(
+            ["typst", "compile", *self.typst_args, "--format", "pdf", "-", "-"],
+            input=source.encode("utf-8"),
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+
+    def close(self):
+        pass
+
+
+class PythonTypstCompiler:
+    """In-process compile through the `typst` Python binding."""
+
+    def __init__(self, typst_args=(), font_paths=(), package_path=None):
+        import typst
+
+        self.typst = typst
+        self.typst_args = list(typst_args)
+        self.options = {"font_paths": list(font_paths)}
+        if package_path:
+            self.options["package_path"] = package_path
+
+    def compile(self, input_path, pdf_path):
+        try:
+            self.typst.compile(input_path, output=pdf_path, **self.options)
+        except Exception as exc:
+            raise TypstWorkerError(f"Typst binding failed: {exc}") from exc
+        return pdf_path
+
+    def compile_bytes(self, source):
+        try:
+            return self.typst.compile(source.encode("utf-8"), **self.options)
+        except Exception as exc:
+            raise TypstWorkerError(f"Typst binding failed: {exc}") from exc
+
+    def close(self):
+        pass
+
+
+class WatchTypstCompiler:
+    """Long-lived `typst watch` session reused for several documents.
+
+    Each document is written over the watched source in a private work
+    directory; the compiled PDF is picked up once its mtime changes and
+    settles. Fonts and packages stay loaded in the running process. A build
+    that fails is noticed from the errors the watcher logs, not by waiting
+    out the timeout.
+    """
+
+    def __init__(self, typst_args=(), timeout=TYPST_WATCH_TIMEOUT_SECONDS):
+        self.typst_args = list(typst_args)
+        self.timeout = timeout
+        self.workdir = None
+        self.process = None
+        self.source_path = None
+        self.output_path = None
+        self.log_path = None
+        self.last_source = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.workdir = tempfile.mkdtemp(prefix="rannich-5minut-typst-")
+        self.source_path = os.path.join(self.workdir, "issue.typ")
+        self.output_path = os.path.join(self.workdir, "issue.pdf")
+        self.log_path = os.path.join(self.workdir, "watch.log")
+        self.last_source = ""
+        with open(self.source_path, "w", encoding="utf-8") as handle:
+            handle.write(self.last_source)
+        with open(self.log_path, "wb") as log:
+            self.process = subprocess.Popen(
+                [
+                    "typst",
+                    "watch",
+                    *self.typst_args,
+                    self.source_path,
+                    self.output_path,
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+            )
+        self._wait_for_output(None, 0)
+
+    def compile(self, input_path, pdf_path):
+        with open(input_path, encoding="utf-8") as handle:
+            source = handle.read()
+        with self.lock:
+            self._build(source)
+            shutil.copyfile(self.output_path, pdf_path)
+            return pdf_path
+
+    def compile_bytes(self, source):
+        with self.lock:
+            self._build(source)
+            with open(self.output_path, "rb") as handle:
+                return handle.read()
+
+    def _build(self, source):
+        if self.process is None:
+            self.start()
+        if self.process.poll() is not None:
+            raise TypstWorkerError("typst watch exited.")
+        write_layout_module(self.workdir)
+        if source != self.last_source:
+            previous = self._output_stamp()
+            log_offset = self._log_size()
+            # Rewrite in place so the watcher keeps following the same file.
+            with open(self.source_path, "w", encoding="utf-8") as handle:
+                handle.write(source)
+            self.last_source = source
+            self._wait_for_output(previous, log_offset)
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.workdir is not None:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def _output_stamp(self):
+        try:
+            stat = os.stat(self.output_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _log_size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+    def _logged_error(self, offset):
+        try:
+            with open(self.log_path, "rb") as handle:
+                handle.seek(offset)
+                log = handle.read().decode("utf-8", errors="replace")
+        except OSError:
+            return None
+        match = TYPST_WATCH_ERROR.search(log)
+        return match.group(0) if match else None
+
+    def _wait_for_output(self, previous, log_offset):
+        deadline = time.monotonic() + self.timeout
+        stamp = self._output_stamp()
+        while stamp == previous:
+            if self.process.poll() is not None:
+                raise TypstWorkerError("typst watch exited.")
+            error = self._logged_error(log_offset)
+            if error:
+                self.last_source = None
+                raise TypstWorkerError(f"typst watch failed: {error}")
+            if time.monotonic() > deadline:
+                self.last_source = None
+                raise TypstWorkerError("typst watch did not produce a PDF in time.")
+            time.sleep(0.02)
+            stamp = self._output_stamp()
+        while True:
+            time.sleep(TYPST_SETTLE_SECONDS)
+            settled = self._output_stamp()
+            if settled == stamp:
+                return
+            stamp = settled
+
+
+TYPST_BACKENDS = ("auto", "subprocess", "python", "watch")
+
+
+def make_typst_compiler(backend="auto", batch=False, assets=None):
+    """Pick a compile backend; `auto` keeps a worker only for batch runs."""
+    typst_args = assets.typst_args() if assets else []
+    font_paths = [assets.font_dir] if assets and os.path.isdir(assets.font_dir) else []
+    package_path = (
+        assets.package_dir if assets and os.path.isdir(assets.package_dir) else None
+    )
+    if backend == "subprocess":
+        return SubprocessTypstCompiler(typst_args)
+    if backend == "python":
+        return PythonTypstCompiler(typst_args, font_paths, package_path)
+    if backend == "watch":
+        return WatchTypstCompiler(typst_args)
+    try:
+        return PythonTypstCompiler(typst_args, font_paths, package_path)
+    except ImportError:
+        pass
+    if batch and shutil.which("typst"):
+        return WatchTypstCompiler(typst_args)
+    return SubprocessTypstCompiler(typst_args)
+
+
+def compile_typst(output_path, compiler=None):
+    with PROFILER.stage(
+        "typst_compile", backend=type(compiler).__name__ if compiler else None
+    ) as record:
+        pdf_path = run_typst_compile(output_path, compiler)
+        record["bytes"] = os.path.getsize(pdf_path)
+    return pdf_path
+
+
+def run_typst_compile(output_path, compiler=None):
+    pdf_path = pdf_path_for(output_path)
+    if compiler is not None:
+        try:
+            return compiler.compile(output_path, pdf_path)
+        except TypstWorkerError as exc:
+            print(f"{exc} Falling back to typst compile.")
+        return SubprocessTypstCompiler(compiler.typst_args).compile(
+            output_path, pdf_path
+        )
+    return SubprocessTypstCompiler().compile(output_path, pdf_path)
+
+
+def compile_typst_bytes(source, compiler=None):
+    """Compile Typst source to PDF bytes without writing either to disk."""
+    source = standalone_typst(source)
+    with PROFILER.stage(
+        "typst_compile",
+        backend=type(compiler).__name__ if compiler else None,
+        in_memory=True,
+    ) as record:
+        if compiler is not None:
+            try:
+                pdf = compiler.compile_bytes(source)
+            except TypstWorkerError as exc:
+                print(f"{exc} Falling back to typst compile.")
+                pdf = SubprocessTypstCompiler(compiler.typst_args).compile_bytes(source)
+        else:
+            pdf = SubprocessTypstCompiler().compile_bytes(source)
+        record["bytes"] = len(pdf)
+    return pdf
+
+
+def print_target(printer=None, options=None, copies=1, timeout=None):
+    return {
+        "printer": printer,
+        "options": dict(options or {}),
+        "copies": copies,
+        "timeout": timeout or PRINT_TIMEOUT_SECONDS,
+    }
+
+
+def load_print_targets(path):
+    """Read `[[printer]]` tables (name, copies, timeout, options) from TOML."""
+    import tomllib
+
+    with open(path, "rb") as handle:
+        config = tomllib.load(handle)
+    return [
+        print_target(
+            entry.get("name"),
+            entry.get("options"),
+            int(entry.get("copies", 1)),
+            entry.get("timeout"),
+        )
+        for entry in config.get("printer", [])
+    ]
+
+
+def print_pdf(pdf, target=None):
+    """Print a PDF file, or PDF bytes piped to lpr."""
+    if target is None:
+        target = print_target()
+    data = pdf if isinstance(pdf, bytes) else None
+    subprocess.run(
+        lpr_command(None if data else pdf, target),
+        input=data,
+        check=True,
+        timeout=target["timeout"],
+    )
+
+
+def lpr_command(pdf_path, target):
+    command = ["lpr"]
+    if target["printer"]:
+        command.extend(["-P", target["printer"]])
+    if target["copies"] > 1:
+        command.extend(["-#", str(target["copies"])])
+    for key, value in {**PRINT_OPTIONS, **target["options"]}.items():
+        command.extend(["-o", f"{key}={value}"])
+    if pdf_path is not None:
+        command.append(pdf_path)
+    return command
+
+
+def layout_targets(targets, layout):
+    """Targets printing on the media of `layout`; their own options still win."""
+    options = TYPST_LAYOUTS[layout][2]
+    return [
+        {**target, "options": {**options, **target["options"]}}
+        for target in targets or [print_target()]
+    ]
+
+
+def print_to_targets(pdf, targets=None, retries=PRINT_RETRIES):
+    """Send one PDF to all targets in parallel; returns (name, status, detail).
+
+    `pdf` is a path or the PDF bytes. Each target is retried independently,
+    so an offline printer does not keep the others from printing.
+    """
+    targets = targets or [print_target()]
+
+    def dispatch(target):
+        for attempt in range(retries + 1):
+            try:
+                with PROFILER.stage("lpr", printer=target["printer"]):
+                    print_pdf(pdf, target)
+            except (subprocess.SubprocessError, OSError) as exc:
+                error = exc
+                if attempt < retries:
+                    time.sleep(PRINT_RETRY_DELAY_SECONDS * (attempt + 1))
+            else:
+                return "ok", f"attempt {attempt + 1}"
+        return "error", str(error)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        outcomes = list(executor.map(dispatch, targets))
+    return [
+        (target["printer"] or "default", status, detail)
+        for target, (status, detail) in zip(targets, outcomes)
+    ]
+
+
+def render_issue(
+    article,
+    dry=False,
+    targets=None,
+    compiler=None,
+    layout=None,
+    force=False,
+    in_memory=False,
+):
+    issue = as_issue(article)
+    output_path, source = typst_issue_document(issue, layout=layout)
+    return render_document(
+        output_path,
+        source,
+        issue_hash(article),
+        dry,
+        layout_targets(targets, layout or source_for_key(issue.source)["layout"]),
+        compiler,
+        force,
+        in_memory,
+    )
+
+
+def render_digest(
+    articles,
+    dry=False,
+    targets=None,
+    compiler=None,
+    layout=None,
+    force=False,
+    in_memory=False,
+):
+    """Compile and print several issues as one document."""
+    issues = [as_issue(article) for article in articles]
+    output_path, source = typst_digest_document(issues, layout=layout)
+    article_hash = content_hash([issue_hash(article) for article in articles])
+    targets = layout_targets(
+        targets, layout or source_for_key(issues[0].source)["layout"]
+    )
+    return render_document(
+        output_path, source, article_hash, dry, targets, compiler, force, in_memory
+    )
+
+
+def render_document(
+    output_path,
+    source,
+    article_hash,
+    dry=False,
+    targets=None,
+    compiler=None,
+    force=False,
+    in_memory=False,
+):
+    """Write, compile and print a document, skipping what a past run did.
+
+    A stamp beside the .typ records the hash of the Typst source (with the
+    layout module) that produced the PDF and the hash of the articles last
+    printed. An unchanged source is not recompiled; the same articles are
+    not printed twice, while an issue edited after publication is.
+
+    With `in_memory` the source is piped to Typst and the PDF bytes to lpr;
+    only the stamp is written, once the document has been printed. Nothing
+    is kept to reuse, so the document is only compiled when it gets printed,
+    or on a dry run, which still compiles and only skips the print.
+    """
+    render = RenderState(output_path, source, force)
+    printing = not dry and render.needs_print(article_hash)
+    if not in_memory:
+        pdf = render.pdf_path
+        if render.needs_compile():
+            render.write_source()
+            compile_typst(output_path, compiler)
+            render.compiled()
+    elif printing or dry:
+        pdf = render.compiled_bytes(compile_typst_bytes(source, compiler))
+    else:
+        render.not_compiled()
+    if printing:
+        render.printed(article_hash, print_to_targets(pdf, targets))
+    return render.result
+
+
+class RenderState:
+    """Stamp bookkeeping shared by the blocking and the asyncio render."""
+
+    def __init__(self, output_path, source, force=False):
+        self.output_path = output_path
+        self.source = source
+        self.pdf_path = pdf_path_for(output_path)
+        self.stamp_path = stamp_path_for(output_path)
+        self.stamp = {} if force else read_stamp(self.stamp_path)
+        self.typst_hash = content_hash([typst_layout_module(), source])
+        self.result = self.pdf_path
+
+    def needs_compile(self):
+        if self.stamp.get("typst") == self.typst_hash and os.path.exists(self.pdf_path):
+            print(f"Unchanged since the last run: {self.pdf_path}")
+            return False
+        return True
+
+    def write_source(self):
+        write_typst_source(self.output_path, self.source)
+        print(f"Typst file written: {self.output_path}")
+
+    def compiled(self):
+        self.stamp["typst"] = self.typst_hash
+        write_stamp(self.stamp_path, self.stamp)
+
+    def compiled_bytes(self, pdf):
+        name = os.path.basename(self.pdf_path)
+        print(f"Compiled {name} in memory ({len(pdf)} bytes)")
+        self.result = f"{name} (in memory)"
+        return pdf
+
+    def not_compiled(self):
+        self.result = f"{os.path.basename(self.pdf_path)} (in memory, not compiled)"
+
+    def needs_print(self, article_hash):
+        if self.stamp.get("printed") == article_hash:
+            print(f"Already printed {self.pdf_path}; use --force to print it again.")
+            return False
+        if self.stamp.get("printed"):
+            print("The issue was updated since it was printed; printing it again.")
+        return True
+
+    def printed(self, article_hash, results):
+        for name, status, detail in results:
+            print(f"Printer {name}: {status} ({detail})")
+        if all(status != "ok" for _, status, _ in results):
+            raise RuntimeError(f"Printing {self.pdf_path} failed on every printer.")
+        self.stamp["printed"] = article_hash
+        self.stamp["printed_at"] = datetime.now().isoformat()
+        write_stamp(self.stamp_path, self.stamp)
+
+
+def issue_record(article):
+    """JSON-serializable issue with a plain ISO `issue_date` for lookups."""
+    issue = as_issue(article)
+    return {
+        "issue_date": issue.day.isoformat() if issue.day else None,
+        **issue.as_dict(),
+    }
+
+
+def export_issues(articles, path):
+    """Append issues to an NDJSON archive, or write a .json file."""
+    records = [issue_record(article) for article in articles]
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(
+                records[0] if len(records) == 1 else records,
+                handle,
+                ensure_ascii=False,
+                indent=2,
+            )
+            handle.write("\n")
+        return
+    with open(path, "a", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def read_issue_archive(path):
+    """Yield issues from a JSON file (object or list) or an NDJSON archive."""
+    with open(path, encoding="utf-8") as handle:
+        if path.endswith(".json"):
+            yield from ensure_list(json.load(handle))
+            return
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def select_archived_issues(issues, dates=None):
+    """Latest archived version of each issue per date and source, filtered.
+
+    Every selected issue has its `issue_date`, also when the record lacked it.
+    """
+    wanted = {day.isoformat() for day in dates} if dates else None
+    selected = {}
+    for issue in issues:
+        issue_date = issue.get("issue_date") or extract_date_only(issue.get("date"))
+        if wanted is None or issue_date in wanted:
+            selected[(str(issue_date), issue.get("source") or DEFAULT_SOURCE)] = {
+                **issue,
+                "issue_date": issue_date,
+            }
+    return [selected[key] for key in sorted(selected)]
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+class IssueArchive:
+    """SQLite archive of past issues with a full-text index over the items.
+
+    Each issue is stored once per source and date together with a digest
+    of its content, so re-adding an unchanged issue costs one lookup and a
+    changed one replaces its rows. Items live in an FTS5 table (diacritics
+    folded, so "babis" finds "Babiš").
+    """
+
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Callers serialize access; the relay adds issues from its handler threads.
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS issues ("
+                    "source TEXT NOT NULL, issue_date TEXT NOT NULL, "
+                    "url TEXT NOT NULL, title TEXT, date TEXT, digest TEXT NOT NULL, "
+                    "PRIMARY KEY (source, issue_date))"
+                )
+                self.connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS items USING fts5("
+                    "text, bullets, source UNINDEXED, issue_date UNINDEXED, "
+                    "position UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+        except sqlite3.OperationalError as exc:
+            self.connection.close()
+            raise ArchiveError(f"Cannot open archive {path}: {exc}") from exc
+
+    def add(self, article):
+        return self.add_many([article])[0]
+
+    def add_many(self, articles):
+        """Store issues in one transaction; returns added/updated/unchanged."""
+        statuses = []
+        with self.connection:
+            for article in articles:
+                statuses.append(self._store(article))
+        return statuses
+
+    def _store(self, article):
+        issue_date = extract_date_only(article.get("date"))
+        if not issue_date:
+            raise ArchiveError(f"Issue without a date: {article.get('url')}")
+        source = article.get("source") or DEFAULT_SOURCE
+        digest = content_hash(article)
+        row = self.connection.execute(
+            "SELECT digest FROM issues WHERE source = ? AND issue_date = ?",
+            (source, issue_date),
+        ).fetchone()
+        if row and row[0] == digest:
+            return "unchanged"
+        self.connection.execute(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                source,
+                issue_date,
+                article["url"],
+                article.get("title"),
+                article.get("date"),
+                digest,
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM items WHERE source = ? AND issue_date = ?",
+            (source, issue_date),
+        )
+        items = article.get("items") or [
+            {"text": article.get("body") or "", "bullets": []}
+        ]
+        self.connection.executemany(
+            "INSERT INTO items (text, bullets, source, issue_date, position) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    item.get("text") or "",
+                    "\n".join(item.get("bullets") or []),
+                    source,
+                    issue_date,
+                    position,
+                )
+                for position, item in enumerate(items, start=1)
+            ],
+        )
+        return "updated" if row else "added"
+
+    def search(self, query, limit=ARCHIVE_SEARCH_LIMIT):
+        """Matching items, newest issue first.
+
+        The query uses FTS5 syntax (AND/OR/NOT, "phrases", prefix*); if it
+        does not parse, its words are searched as plain terms instead.
+        """
+        sql = (
+            "SELECT items.source, items.issue_date, issues.url, items.position, "
+            "snippet(items, -1, '[', ']', '…', 16) "
+            "FROM items JOIN issues ON issues.source = items.source "
+            "AND issues.issue_date = items.issue_date "
+            "WHERE items MATCH ? ORDER BY items.issue_date DESC, rank LIMIT ?"
+        )
+        try:
+            rows = self.connection.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            quoted = " ".join(
+                '"' + word.replace('"', '""') + '"' for word in query.split()
+            )
+            rows = self.connection.execute(sql, (quoted, limit)).fetchall()
+        return [
+            {
+                "source": source,
+                "issue_date": issue_date,
+                "url": url,
+                "position": position,
+                "snippet": snippet,
+            }
+            for source, issue_date, url, position, snippet in rows
+        ]
+
+    def close(self):
+        self.connection.close()
+
+
+def extract_canonical_url(html_text):
+    for tag in re.findall(r"<link\b[^>]*>", html_text, re.IGNORECASE):
+        if re.search(r"""\brel\s*=\s*["']?canonical\b""", tag, re.IGNORECASE):
+            match = re.search(r"""\bhref\s*=\s*["']([^"']+)""", tag, re.IGNORECASE)
+            if match:
+                return html.unescape(match.group(1))
+    return None
+
+
+def iter_saved_articles(path, source=None):
+    """Yield (source, article or None) for saved pages under `path`.
+
+    A cache directory (see HttpCache) yields its parsed articles; any other
+    directory is searched for .html files, parsed like a fetched page. Pages
+    without a JSON-LD date take it from the file name.
+    """
+    if os.path.isdir(os.path.join(path, "entries")):
+        for entry in HttpCache(path).entries():
+            if entry.get("article"):
+                yield entry["url"], entry["article"]
+        return
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(path)
+            for name in names
+            if name.endswith((".html", ".htm"))
+        )
+    for file_path in paths:
+        try:
+            with open(file_path, encoding="utf-8", errors="replace") as handle:
+                html_text = handle.read()
+        except OSError:
+            yield file_path, None
+            continue
+        url = extract_canonical_url(html_text) or f"file://{os.path.abspath(file_path)}"
+        article = parse_article(url, html_text, source)
+        if not article.get("date"):
+            match = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(file_path))
+            article["date"] = match.group(0) if match else None
+        yield file_path, article
+
+
+def import_saved_articles(archive, paths, source=None):
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    articles = []
+    for path in paths:
+        for origin, article in iter_saved_articles(path, source):
+            if article and extract_date_only(article.get("date")):
+                articles.append(article)
+            else:
+                counts["skipped"] += 1
+                print(f"Skipped {origin}: no issue date")
+    for status in archive.add_many(articles):
+        counts[status] += 1
+    return counts
+
+
+def date_range(start, end):
+    if end < start:
+        raise ValueError("End date must not be before start date.")
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def backfill(
+    dates,
+    pollers,
+    cache=None,
+    offline=False,
+    dry=False,
+    targets=None,
+    workers=BACKFILL_WORKERS,
+    compiler=None,
+    sinks=(),
+    layout=None,
+    poll=False,
+    poll_timeout=None,
+    force=False,
+    in_memory=False,
+    relay=None,
+    stories=None,
+):
+    """Fetch and render several dates and sources.
+
+    Returns (source, date, status, detail) tuples. Issues are rendered date
+    by date, each as soon as it is downloaded. With `stories` each is
+    printed with the ledes already in; the rest are added once all issues
+    are printed.
+    """
+    results = []
+    prefetches = []
+    for key, day, article, problem in fetch_issues(
+        dates, pollers, cache, offline, workers, poll, poll_timeout, relay
+    ):
+        if article is None:
+            results.append((key, day, *problem))
+            continue
+        prefetch = None
+        if stories is not None:
+            prefetch = StoryPrefetch(article, cache, offline, stories)
+            article = prefetch.article()
+        try:
+            if prefetch is None:
+                for sink in sinks:
+                    sink(article)
+            pdf_path = render_issue(
+                article, dry, targets, compiler, layout, force, in_memory
+            )
+        except Exception as exc:
+            results.append((key, day, "error", str(exc)))
+            rendered = False
+        else:
+            results.append((key, day, "ok", pdf_path))
+            rendered = True
+        if prefetch is not None:
+            prefetches.append((prefetch, rendered))
+
+    def keep_ledes(article):
+        # Dry: the issue is printed already, only the kept PDF gets the ledes.
+        render_issue(article, True, targets, compiler, layout)
+
+    for prefetch, rendered in prefetches:
+        finish_stories(
+            prefetch, sinks, keep_ledes if rendered and not in_memory else None
+        )
+    return results
+
+
+def fetch_issues(
+    dates,
+    pollers,
+    cache=None,
+    offline=False,
+    workers=BACKFILL_WORKERS,
+    poll=False,
+    poll_timeout=None,
+    relay=None,
+):
+    """Yield (source, date, article, None) or (source, date, None, problem).
+
+    Every source's feed is read once, all feeds in parallel, and the
+    articles are fetched concurrently over the shared HTTP session. Dates
+    come out in order; within a date, sources in the order they finish.
+    With `poll`, a source whose issue is not out yet is polled on its own.
+    With a `relay`, feeds are only read for issues the relay fails to give.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import as_completed
+
+    lookups = {}
+    lookups_lock = threading.Lock()
+
+    def lookup(poller):
+        if not poll:
+            return poller.fetch_overview_urls(dates)
+        return {
+            day: wait_for_overview_url(poller, day, True, poll_timeout) for day in dates
+        }
+
+    def overview_urls(poller):
+        with lookups_lock:
+            key = poller.source["key"]
+            if key not in lookups:
+                lookups[key] = feeds.submit(lookup, poller)
+            return lookups[key]
+
+    def fetch(poller, day):
+        article = None
+        if relay is not None:
+            article = fetch_from_relay(relay, poller, day, poll, poll_timeout)
+        if article is None:
+            url = overview_urls(poller).result().get(day)
+            if url is None:
+                raise DateNotAvailableError("No RSS entry found.")
+            article = fetch_article(url, cache, offline, poller.source)
+        return article
+
+    with ThreadPoolExecutor(max_workers=len(pollers)) as feeds:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if relay is None:
+                for poller in pollers:
+                    overview_urls(poller)
+            futures = {
+                day: {
+                    executor.submit(fetch, poller, day): poller.source["key"]
+                    for poller in pollers
+                }
+                for day in dates
+            }
+            for day in dates:
+                for future in as_completed(futures[day]):
+                    key = futures[day][future]
+                    try:
+                        article = future.result()
+                    except DateNotAvailableError as exc:
+                        yield key, day, None, ("missing", str(exc))
+                    except Exception as exc:
+                        yield key, day, None, ("error", str(exc))
+                    else:
+                        yield key, day, article, None
+
+
+def digest(
+    dates,
+    pollers,
+    cache=None,
+    offline=False,
+    dry=False,
+    targets=None,
+    workers=BACKFILL_WORKERS,
+    compiler=None,
+    sinks=(),
+    layout=None,
+    force=False,
+    in_memory=False,
+    relay=None,
+    stories=None,
+):
+    """Fetch several dates into one digest PDF; returns (results, pdf_path).
+
+    Missing or failed issues are left out of the digest and reported in
+    the (source, date, status, detail) results.
+    """
+    order = {poller.source["key"]: index for index, poller in enumerate(pollers)}
+    results = []
+    collected = []
+    for key, day, article, problem in fetch_issues(
+        dates, pollers, cache, offline, workers, relay=relay
+    ):
+        if article is None:
+            results.append((key, day, *problem))
+            continue
+        prefetch = None
+        if stories is not None:
+            prefetch = StoryPrefetch(article, cache, offline, stories)
+        else:
+            for sink in sinks:
+                sink(article)
+        collected.append((day, order[key], article, prefetch))
+        results.append((key, day, "ok", "included"))
+    if not collected:
+        return results, None
+    collected.sort(key=lambda c: c[:2])
+    prefetches = [prefetch for *_, prefetch in collected if prefetch is not None]
+    try:
+        pdf_path = render_digest(
+            [
+                prefetch.article() if prefetch else article
+                for *_, article, prefetch in collected
+            ],
+            dry,
+            targets,
+            compiler,
+            layout,
+            force,
+            in_memory,
+        )
+    finally:
+        # Sinks get the issues with their ledes, whether the digest printed.
+        articles = [finish_stories(prefetch, sinks) for prefetch in prefetches]
+    if not in_memory and any(
+        prefetch.fetched > prefetch.shown for prefetch in prefetches
+    ):
+        try:
+            render_digest(articles, True, targets, compiler, layout)
+        except Exception as exc:
+            print(f"Adding the stories to the digest failed: {exc}")
+    return results, pdf_path
+
+
+async def run_command_async(command, timeout=None, input=None):
+    """Run a command without blocking the event loop; returns its stdout.
+
+    `input` bytes are fed to stdin. The process is killed if the awaiting
+    task is cancelled or `timeout` seconds pass.
+    """
+    import asyncio
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.DEVNULL if input is None else asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            stdout, _ = await process.communicate(input)
+    except TimeoutError:
+        raise subprocess.TimeoutExpired(command, timeout) from None
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return stdout
+
+
+class AsyncTypstCompiler:
+    """`typst compile` as an asyncio subprocess, `jobs` documents at a time."""
+
+    def __init__(self, typst_args=(), jobs=PIPELINE_TYPST_JOBS):
+        import asyncio
+
+        self.typst_args = list(typst_args)
+        self.slots = asyncio.Semaphore(jobs)
+
+    async def compile(self, input_path, pdf_path):
+        async with self.slots:
+            await run_command_async(
+                ["typst", "compile", *self.typst_args, input_path, pdf_path],
+                TYPST_TIMEOUT_SECONDS,
+            )
+        return pdf_path
+
+    async def compile_bytes(self, source):
+        async with self.slots:
+            return await run_command_async(
+                ["typst", "compile", *self.typst_args, "--format", "pdf", "-", "-"],
+                TYPST_TIMEOUT_SECONDS,
+                source.encode("utf-8"),
+            )
+
+
+async def compile_typst_async(output_path, compiler=None):
+    compiler = compiler or AsyncTypstCompiler()
+    with PROFILER.stage("typst_compile", backend=type(compiler).__name__) as record:
+        pdf_path = await compiler.compile(output_path, pdf_path_for(output_path))
+        record["bytes"] = os.path.getsize(pdf_path)
+    return pdf_path
+
+
+async def compile_typst_bytes_async(source, compiler=None):
+    compiler = compiler or AsyncTypstCompiler()
+    with PROFILER.stage(
+        "typst_compile", backend=type(compiler).__name__, in_memory=True
+    ) as record:
+        pdf = await compiler.compile_bytes(standalone_typst(source))
+        record["bytes"] = len(pdf)
+    return pdf
+
+
+async def print_to_targets_async(pdf, targets=None, retries=PRINT_RETRIES):
+    """Asyncio counterpart of print_to_targets()."""
+    import asyncio
+
+    targets = targets or [print_target()]
+    data = pdf if isinstance(pdf, bytes) else None
+
+    async def dispatch(target):
+        for attempt in range(retries + 1):
+            try:
+                with PROFILER.stage("lpr", printer=target["printer"]):
+                    await run_command_async(
+                        lpr_command(None if data else pdf, target),
+                        target["timeout"],
+                        data,
+                    )
+            except (subprocess.SubprocessError, OSError) as exc:
+                error = exc
+                if attempt < retries:
+                    await asyncio.sleep(PRINT_RETRY_DELAY_SECONDS * (attempt + 1))
+            else:
+                return "ok", f"attempt {attempt + 1}"
+        return "error", str(error)
+
+    outcomes = await asyncio.gather(*(dispatch(target) for target in targets))
+    return [
+        (target["printer"] or "default", status, detail)
+        for target, (status, detail) in zip(targets, outcomes)
+    ]
+
+
+async def render_document_async(
+    output_path,
+    source,
+    article_hash,
+    dry=False,
+    targets=None,
+    compiler=None,
+    force=False,
+    in_memory=False,
+    turn=None,
+):
+    """Asyncio counterpart of render_document().
+
+    `turn` is an asyncio.Event waited for before printing, so documents
+    compiled out of order still come out of the printer in order.
+    """
+    render = RenderState(output_path, source, force)
+    printing = not dry and render.needs_print(article_hash)
+    if not in_memory:
+        pdf = render.pdf_path
+        if render.needs_compile():
+            render.write_source()
+            await compile_typst_async(output_path, compiler)
+            render.compiled()
+    elif printing or dry:
+        pdf = render.compiled_bytes(await compile_typst_bytes_async(source, compiler))
+    else:
+        render.not_compiled()
+    if dry:
+        return render.result
+    if turn is not None:
+        await turn.wait()
+    if printing:
+        render.printed(article_hash, await print_to_targets_async(pdf, targets))
+    return render.result
+
+
+async def render_issue_async(
+    article,
+    dry=False,
+    targets=None,
+    compiler=None,
+    layout=None,
+    force=False,
+    in_memory=False,
+    turn=None,
+):
+    issue = as_issue(article)
+    output_path, source = typst_issue_document(issue, layout=layout)
+    return await render_document_async(
+        output_path,
+        source,
+        issue_hash(article),
+        dry,
+        layout_targets(targets, layout or source_for_key(issue.source)["layout"]),
+        compiler,
+        force,
+        in_memory,
+        turn,
+    )
+
+
+async def run_pipeline(
+    dates,
+    pollers,
+    cache=None,
+    offline=False,
+    dry=False,
+    targets=None,
+    compiler=None,
+    sinks=(),
+    layout=None,
+    force=False,
+    in_memory=False,
+    workers=BACKFILL_WORKERS,
+    poll=False,
+    poll_timeout=None,
+    timeout=None,
+    stories=None,
+    relay=None,
+):
+    """Fetch, compile and print issues as overlapping asyncio stages.
+
+    Returns (source, date, status, detail) tuples like backfill(). Feeds
+    and articles are downloaded in worker threads, at most `workers` at a
+    time, while Typst and lpr run as asyncio subprocesses, so one issue
+    compiles while the next downloads and the one before prints. Issues
+    are printed in date and source order. Once `timeout` seconds pass, the
+    unfinished issues are cancelled, their subprocesses killed, and they
+    are reported as errors; a download already running finishes in its
+    thread. Cancelling the awaiting task cancels the whole run. With a
+    `relay`, feeds are only read for issues the relay fails to give. With
+    `stories`, an issue prints with the ledes already in and the rest are
+    added to its PDF afterwards, without holding up the next issue.
+    """
+    import asyncio
+
+    compiler = compiler or AsyncTypstCompiler()
+    downloads = asyncio.Semaphore(workers)
+    jobs = [(poller, day) for day in dates for poller in pollers]
+    turns = [asyncio.Event() for _ in jobs]
+    results = {}
+
+    async def overview_urls(poller):
+        if poll:
+            return None
+        try:
+            async with downloads:
+                return await asyncio.to_thread(poller.fetch_overview_urls, dates)
+        except Exception as exc:
+            return exc
+
+    async def overview_url(poller, day, lookup):
+        if poll:
+            return await asyncio.to_thread(
+                wait_for_overview_url, poller, day, True, poll_timeout
+            )
+        if lookup is None:
+            async with downloads:
+                return await asyncio.to_thread(poller.fetch_overview_url, day)
+        urls = await lookup
+        if isinstance(urls, Exception):
+            raise urls
+        if day not in urls:
+            raise DateNotAvailableError("No RSS entry found.")
+        return urls[day]
+
+    async def run(index, poller, day, lookup):
+        key = poller.source["key"]
+        prefetch = None
+        try:
+            article = None
+            if relay is not None:
+                article = await asyncio.to_thread(
+                    fetch_from_relay, relay, poller, day, poll, poll_timeout
+                )
+            if article is None:
+                url = await overview_url(poller, day, lookup)
+                async with downloads:
+                    article = await asyncio.to_thread(
+                        fetch_article, url, cache, offline, poller.source
+                    )
+            if stories is not None:
+                prefetch = StoryPrefetch(article, cache, offline, stories)
+                article = prefetch.article()
+            else:
+                for sink in sinks:
+                    sink(article)
+            pdf_path = await render_issue_async(
+                article,
+                dry,
+                targets,
+                compiler,
+                layout,
+                force,
+                in_memory,
+                turns[index - 1] if index else None,
+            )
+        except DateNotAvailableError as exc:
+            results[index] = (key, day, "missing", str(exc))
+        except Exception as exc:
+            results[index] = (key, day, "error", str(exc))
+        else:
+            results[index] = (key, day, "ok", pdf_path)
+        finally:
+            turns[index].set()
+        if prefetch is None:
+            return
+        # The next issue prints meanwhile; this one's PDF gets the ledes.
+        article = await asyncio.to_thread(prefetch.finish)
+        try:
+            for sink in sinks:
+                sink(article)
+            late = prefetch.fetched > prefetch.shown
+            if results[index][2] == "ok" and late and not in_memory:
+                await render_issue_async(article, True, targets, compiler, layout)
+        except Exception as exc:
+            print(f"Adding the stories to {article.get('url')} failed: {exc}")
+
+    try:
+        async with asyncio.timeout(timeout):
+            async with asyncio.TaskGroup() as group:
+                lookups = {
+                    poller.source["key"]: (
+                        group.create_task(overview_urls(poller))
+                        if relay is None
+                        else None
+                    )
+                    for poller in pollers
+                }
+                for index, (poller, day) in enumerate(jobs):
+                    lookup = lookups[poller.source["key"]]
+                    group.create_task(run(index, poller, day, lookup))
+    except TimeoutError:
+        pass
+    return [
+        results.get(index)
+        or (poller.source["key"], day, "error", f"timed out after {timeout}s")
+        for index, (poller, day) in enumerate(jobs)
     ]
-    return names[day_index]
 
 
-def format_typst(article):
-    title = article.get("title") or "Daily overview"
-    date = article.get("date")
-    url = article.get("url")
-    items = article.get("items") or []
-    lines = []
+def next_serve_run(now, last_date=None, schedule=SERVE_SCHEDULE):
+    """Next scheduled run; today's window is caught up if it was missed."""
+    day = now.date()
+    if day == last_date:
+        day += timedelta(days=1)
+    return max(datetime.combine(day, schedule[day.weekday()]), now)
 
-    lines.append(
-        """
-#import "@preview/cades:0.3.1": qr-code
-#set page(
-  paper: "a4",
-  columns: 2,
-  margin: 1cm,
-  footer: context [
-"""
-        f"  *Ranních 5 minut -- {escape_typst_text(czech_weekday(date))} -- {escape_typst_text(date)}*"
-        """
-    #h(1fr)
-    #counter(page).display(
-      "1/1",
-      both: true,
+
+def write_status(status_path, status):
+    status = {**status, "pid": os.getpid(), "updated_at": datetime.now().isoformat()}
+    os.makedirs(os.path.dirname(status_path) or ".", exist_ok=True)
+    write_atomic(
+        status_path,
+        json.dumps(status, ensure_ascii=False, indent=2).encode("utf-8"),
     )
-  ]
-)
 
-#set columns(gutter: 12pt)
-#set text(
-  font: "Franklin Gothic FS",
-  size: 10pt,
-)
 
-#let separator(
-  width: 60%,
-  stroke: 0.5pt,
-  top-gap: 0.1em,
-  bottom-gap: 0.1em,
-) = {
-  v(top-gap)
-  align(center)[
-    #line(length: width, stroke: stroke)
-  ]
-  v(bottom-gap)
-}
-"""
-    )
+def read_status(status_path):
+    try:
+        with open(status_path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def serve(
+    pollers,
+    cache=None,
+    compiler=None,
+    dry=False,
+    targets=None,
+    poll_timeout=POLL_TIMEOUT_MINUTES,
+    status_path=SERVE_STATUS_PATH,
+    schedule=SERVE_SCHEDULE,
+    sinks=(),
+    layout=None,
+    force=False,
+    in_memory=False,
+    relay=None,
+    stories=None,
+):
+    """Stay resident and print each day's issues in the scheduled window.
 
-    lines.append(f"= {escape_typst_text(title)}")
-    if date:
-        lines.append(
-            f"_Vydáno: {escape_typst_text(date)}, {escape_typst_text(czech_weekday(date))}_"
+    All sources are polled concurrently and each issue is printed as soon
+    as it is out. The HTTP session, cache and Typst compiler are reused
+    across days and the current state is kept in a JSON status file.
+    """
+    last_run = read_status(status_path).get("last_run")
+    last_date = None
+    if last_run and last_run.get("status") == "ok":
+        last_date = date_type.fromisoformat(last_run["date"])
+    while True:
+        run_at = next_serve_run(datetime.now(), last_date, schedule)
+        write_status(
+            status_path,
+            {"state": "sleeping", "next_run": run_at.isoformat(), "last_run": last_run},
         )
-    lines.append("")
+        while datetime.now() < run_at:
+            remaining = (run_at - datetime.now()).total_seconds()
+            time.sleep(max(0, min(remaining, SERVE_SLEEP_SECONDS)))
+        target_date = run_at.date()
+        write_status(
+            status_path,
+            {"state": "running", "date": target_date.isoformat(), "last_run": last_run},
+        )
+        try:
+            results = backfill(
+                [target_date],
+                pollers,
+                cache=cache,
+                dry=dry,
+                targets=targets,
+                compiler=compiler,
+                sinks=sinks,
+                layout=layout,
+                poll=True,
+                poll_timeout=poll_timeout,
+                force=force,
+                in_memory=in_memory,
+                relay=relay,
+                stories=stories,
+            )
+        except Exception as exc:
+            results = [(None, target_date, "error", str(exc))]
+        failed = [result for result in results if result[2] != "ok"]
+        for key, _, _, detail in failed:
+            print(
+                f"Error exporting overview for {target_date.isoformat()} "
+                f"({key or 'all sources'}): {detail}"
+            )
+        last_run = {
+            "date": target_date.isoformat(),
+            "status": "error" if failed else "ok",
+            "detail": "; ".join(
+                f"{key}: {detail}" if len(results) > 1 else detail
+                for key, _, _, detail in (failed or results)
+            ),
+            "finished_at": datetime.now().isoformat(),
+        }
+        # Errors are not retried the same day; the issue may simply be skipped.
+        last_date = target_date
+        if cache:
+            cache.evict()
 
-    if items:
-        for index, item in enumerate(items):
-            heading = (item.get("text") or "").strip() or "Item"
-            lines.append(f"{escape_typst_text(heading)}")
-            bullets = [b.strip() for b in item.get("bullets") or [] if b.strip()]
-            for bullet in bullets:
-                lines.append(f"- {escape_typst_text(bullet)}")
-            if index < len(items) - 1:
-                lines.append("")
-            lines.append("#separator()")
-        lines.append(f'_Zdroj: #link("{escape_typst_link_target(url)}")_')
-        lines.append(f'#qr-code("{escape_typst_link_target(url)}", width: 2cm)')
-        lines.append("")
-        return "\n".join(lines).rstrip() + "\n"
 
-    body = article.get("body", "") or ""
-    for line in body.splitlines():
-        lines.append(escape_typst_text(line))
-    return "\n".join(lines).rstrip() + "\n"
+class RelayError(RuntimeError):
+    pass
+
+
+class IssueRelay:
+    """Issues and compiled PDFs shared with other print nodes over HTTP.
+
+    Each source's feed and articles are fetched through one poller and the
+    HTTP cache, at most once per RELAY_RECHECK_SECONDS per issue however
+    many clients ask. PDFs are kept by the hash of their Typst source, so a
+    client that renders the very same source can take the PDF instead. Each
+    source is compiled once; a failed compile is remembered for
+    RELAY_RECHECK_SECONDS rather than retried by every request. With
+    `stories` an issue is served at once and gets its ledes when they are in.
+    """
+
+    def __init__(self, pollers, cache=None, compiler=None, sinks=(), stories=None):
+        self.pollers = {poller.source["key"]: poller for poller in pollers}
+        self.cache = cache
+        self.stories = stories
+        self.compiler = compiler
+        self.sinks = sinks
+        self.locks = {key: threading.Lock() for key in self.pollers}
+        # Per source, so each is only touched under that source's lock.
+        self.checked = {key: {} for key in self.pollers}
+        self.seen = {key: {} for key in self.pollers}
+        self.pdfs = OrderedDict()
+        self.failed = {}
+        self.pdf_lock = threading.Lock()
+        self.compile_lock = threading.Lock()
+        self.sink_lock = threading.Lock()
+
+    def article(self, key, day, wait=0):
+        """The issue, waiting up to `wait` seconds for it; None if not out."""
+        deadline = time.monotonic() + wait
+        while True:
+            with self.locks[key]:
+                article = self._article(key, day)
+            remaining = deadline - time.monotonic()
+            if article is not None or remaining <= 0:
+                return article
+            time.sleep(min(remaining, RELAY_RECHECK_SECONDS))
+
+    def _article(self, key, day):
+        now = time.monotonic()
+        checked_at, article = self.checked[key].get(day, (None, None))
+        if checked_at is not None and now - checked_at < RELAY_RECHECK_SECONDS:
+            return article
+        self.checked[key] = {
+            entry: value
+            for entry, value in self.checked[key].items()
+            if now - value[0] < RELAY_RECHECK_SECONDS
+        }
+        poller = self.pollers[key]
+        try:
+            url = poller.fetch_overview_url(day)
+        except DateNotAvailableError:
+            article = None
+        else:
+            article = fetch_article(url, self.cache, source=poller.source)
+            digest = issue_hash(article)
+            new = self.seen[key].get(day) != digest
+            self.seen[key][day] = digest
+            if self.stories is not None:
+                # Clients get the issue now; the ledes follow once they are in.
+                prefetch = StoryPrefetch(article, self.cache, budget=self.stories)
+                article = prefetch.article()
+                threading.Thread(
+                    target=self._add_stories,
+                    args=(key, day, now, prefetch, new),
+                    daemon=True,
+                ).start()
+            elif new:
+                self._sink(article)
+        self.checked[key][day] = (now, article)
+        return article
+
+    def _add_stories(self, key, day, checked_at, prefetch, new):
+        article = prefetch.finish()
+        with self.locks[key]:
+            if self.checked[key].get(day, (None, None))[0] == checked_at:
+                self.checked[key][day] = (checked_at, article)
+        if new:
+            self._sink(article)
+
+    def _sink(self, article):
+        with self.sink_lock:
+            for sink in self.sinks:
+                sink(article)
+
+    def pdf(self, article, layout=None):
+        """(source hash, PDF bytes) of an issue, compiled once per source."""
+        _, source = typst_issue_document(article, layout=layout)
+        source = standalone_typst(source)
+        digest = content_hash(source)
+        pdf = self.cached_pdf(digest)
+        if pdf is not None:
+            return digest, pdf
+        with self.compile_lock:
+            # Whoever held the lock may have just compiled (or failed) this one.
+            pdf = self.cached_pdf(digest)
+            if pdf is not None:
+                return digest, pdf
+            now = time.monotonic()
+            self.failed = {
+                entry: value
+                for entry, value in self.failed.items()
+                if now - value[0] < RELAY_RECHECK_SECONDS
+            }
+            if digest in self.failed:
+                raise RelayError(self.failed[digest][1])
+            try:
+                pdf = compile_typst_bytes(source, self.compiler)
+            except Exception as exc:
+                self.failed[digest] = (now, f"Compiling the issue failed: {exc}")
+                raise
+        with self.pdf_lock:
+            self.pdfs[digest] = pdf
+            while len(self.pdfs) > RELAY_PDF_CACHE:
+                self.pdfs.popitem(last=False)
+        return digest, pdf
+
+    def cached_pdf(self, digest):
+        with self.pdf_lock:
+            pdf = self.pdfs.get(digest)
+            if pdf is not None:
+                self.pdfs.move_to_end(digest)
+            return pdf
+
+
+def serve_relay(relay, host="", port=RELAY_PORT):
+    """Answer relay clients until interrupted.
+
+    GET /<source>/<date>.json returns the parsed issue and compiles its PDF
+    for the source's layout; /<source>/<date>.pdf (`?layout=`) the PDF;
+    /pdf/<hash>.pdf a PDF compiled earlier from a Typst source with that
+    hash. `?wait=SECONDS` holds the request until the issue is out. Every
+    answer has an ETag and If-None-Match gets 304; 404 means not out yet.
+    """
+    from http.server import BaseHTTPRequestHandler
+    from http.server import ThreadingHTTPServer
+    from urllib.parse import parse_qs
+    from urllib.parse import urlsplit
+
+    class RelayRequestHandler(BaseHTTPRequestHandler):
+        server_version = f"rannich-5minut/{VERSION}"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                self.route(url.path, query)
+            except Exception as exc:
+                self.send_json(502, {"error": str(exc)})
+
+        def route(self, path, query):
+            match = RELAY_PDF_PATH.fullmatch(path)
+            if match:
+                pdf = relay.cached_pdf(match.group(1))
+                if pdf is None:
+                    return self.send_json(404, {"error": "Unknown PDF."})
+                return self.send_body(pdf, "application/pdf", match.group(1))
+            match = RELAY_PATH.fullmatch(path)
+            if not match:
+                return self.send_json(404, {"error": "Not found."})
+            key, day, kind = match.groups()
+            layout = query.get("layout")
+            if key not in relay.pollers or layout not in (None, *TYPST_LAYOUTS):
+                return self.send_json(400, {"error": "Unknown source or layout."})
+            try:
+                day = date_type.fromisoformat(day)
+                wait = float(query.get("wait", 0))
+            except ValueError:
+                return self.send_json(400, {"error": "Bad date or wait."})
+            if not math.isfinite(wait) or wait < 0:
+                return self.send_json(400, {"error": "Bad date or wait."})
+            wait = min(wait, RELAY_MAX_WAIT_SECONDS)
+            article = relay.article(key, day, wait)
+            if article is None:
+                return self.send_json(404, {"error": "Issue is not out yet."})
+            if kind == "pdf":
+                digest, pdf = relay.pdf(article, layout)
+                return self.send_body(pdf, "application/pdf", digest)
+            try:
+                relay.pdf(article)
+            except Exception as exc:
+                self.log_message("Compiling %s %s failed: %s", key, day, exc)
+            body = json.dumps(article, ensure_ascii=False).encode("utf-8")
+            self.send_body(body, "application/json", content_hash(article))
+
+        def send_body(self, body, content_type, digest):
+            etag = f'"{digest}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, status, value):
+            body = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), RelayRequestHandler)
+    server.daemon_threads = True
+    print(f"Relay listening on http://{host or '0.0.0.0'}:{port}/")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class RelayClient:
+    """Issues and PDFs from a relay node instead of from Deník N.
+
+    Answers are kept with their ETag, so asking again for an unchanged
+    issue costs a 304.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.responses = {}
+        self.lock = threading.Lock()
+
+    def get(self, path, wait=0):
+        """(status, body) of a relay GET; 304 is answered from memory."""
+        import requests
+
+        url = f"{self.url}{path}"
+        with self.lock:
+            etag, body = self.responses.get(url, (None, None))
+        try:
+            response = http_session().get(
+                url,
+                params={"wait": f"{wait:.0f}"} if wait else None,
+                headers={"If-None-Match": etag} if etag else None,
+                timeout=wait + HTTP_TIMEOUT_SECONDS,
+            )
+        except requests.RequestException as exc:
+            raise RelayError(f"Relay {self.url} unreachable: {exc}") from exc
+        if response.status_code == 304 and body is not None:
+            return 200, body
+        if response.status_code == 200:
+            with self.lock:
+                self.responses[url] = (response.headers.get("ETag"), response.content)
+            return 200, response.content
+        if response.status_code == 404:
+            return 404, None
+        raise RelayError(f"Relay {self.url} answered {response.status_code}.")
+
+    def fetch_article(self, source, day, wait=0):
+        """The parsed issue, long-polling the relay for up to `wait` seconds."""
+        deadline = time.monotonic() + wait
+        path = f"/{source['key']}/{day.isoformat()}.json"
+        while True:
+            remaining = max(0, deadline - time.monotonic())
+            with PROFILER.stage("relay_fetch", url=path) as record:
+                status, body = self.get(path, min(remaining, RELAY_MAX_WAIT_SECONDS))
+                record["status"] = status
+            if status == 200:
+                try:
+                    return json.loads(body)
+                except ValueError as exc:
+                    raise RelayError(f"Relay {self.url} sent bad JSON.") from exc
+            if deadline - time.monotonic() <= 0:
+                raise DateNotAvailableError(
+                    f"Issue for {day.isoformat()} is not out (relay {self.url})."
+                )
+
+    def pdf(self, source):
+        """PDF the relay compiled from this Typst source, or None."""
+        digest = content_hash(standalone_typst(source))
+        try:
+            status, body = self.get(f"/pdf/{digest}.pdf")
+        except RelayError:
+            return None
+        return body if status == 200 else None
+
+
+class RelayTypstCompiler:
+    """Takes PDFs the relay already compiled, compiles the rest locally."""
+
+    def __init__(self, relay, compiler):
+        self.relay = relay
+        self.compiler = compiler
+        self.typst_args = compiler.typst_args
+
+    def compile(self, input_path, pdf_path):
+        with open(input_path, encoding="utf-8") as handle:
+            pdf = self.relay.pdf(handle.read())
+        if pdf is None:
+            return self.compiler.compile(input_path, pdf_path)
+        with open(pdf_path, "wb") as handle:
+            handle.write(pdf)
+        return pdf_path
+
+    def compile_bytes(self, source):
+        pdf = self.relay.pdf(source)
+        return self.compiler.compile_bytes(source) if pdf is None else pdf
+
+    def close(self):
+        self.compiler.close()
+
+
+def fetch_from_relay(relay, poller, day, poll=False, poll_timeout=None):
+    """The issue from the relay; None when it fails and Deník N is next."""
+    if poll_timeout is None:
+        poll_timeout = POLL_TIMEOUT_MINUTES
+    try:
+        return relay.fetch_article(poller.source, day, poll_timeout * 60 if poll else 0)
+    except RelayError as exc:
+        print(f"{exc} Fetching {poller.source['key']} {day} directly.")
+        return None
+
+
+def parse_relay_address(value):
+    """`[HOST:]PORT` for --relay."""
+    host, _, port = value.rpartition(":")
+    try:
+        return host, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid address: {value}") from None
+
+
+def parse_iso_date(value):
+    try:
+        return date_type.fromisoformat(value)
+    except ValueError as exc:
+        raise RuntimeError("Date must be in ISO format YYYY-MM-DD.") from exc
 
 
 if __name__ == "__main__":
+    show_profile = False
     try:
         parser = argparse.ArgumentParser()
+        parser.add_argument("--version", action="version", version=VERSION)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Check dependencies, Typst assets and printers, then exit.",
+        )
+        commands = parser.add_subparsers(dest="command")
+        search_parser = commands.add_parser(
+            "search", help="Full-text search in the local issue archive."
+        )
+        search_parser.add_argument("query", nargs="+", help="Words or FTS5 query.")
+        search_parser.add_argument(
+            "-l",
+            "--limit",
+            type=int,
+            default=ARCHIVE_SEARCH_LIMIT,
+            help="Maximum number of matching items.",
+        )
+        import_parser = commands.add_parser(
+            "import",
+            help="Add saved HTML pages (or a cache directory) to the archive.",
+        )
+        import_parser.add_argument(
+            "paths", nargs="+", help="HTML files, directories or --cache-dir."
+        )
+        import_parser.add_argument(
+            "-s",
+            "--source",
+            dest="import_source",
+            default=DEFAULT_SOURCE,
+            help="Newsletter the saved HTML pages belong to.",
+        )
+        for command_parser in (search_parser, import_parser):
+            command_parser.add_argument(
+                "--archive",
+                default=argparse.SUPPRESS,
+                help="SQLite archive of past issues.",
+            )
         parser.add_argument(
             "-n",
             "--dry",
@@ -622,14 +4032,214 @@ if __name__ == "__main__":
         parser.add_argument(
             "-P",
             "--printer",
+            action="append",
+            default=[],
+            help="Printer name passed to lpr (optional, repeatable).",
+        )
+        parser.add_argument(
+            "-s",
+            "--source",
+            action="append",
             default=None,
-            help="Printer name passed to lpr (optional).",
+            help=(
+                f"Newsletter to fetch (repeatable, 'all' for every known one; "
+                f"defaults to {DEFAULT_SOURCE})."
+            ),
+        )
+        parser.add_argument(
+            "--sources-config",
+            default=SOURCES_CONFIG_PATH,
+            help="TOML file with extra [[source]] newsletters (used when it exists).",
+        )
+        parser.add_argument(
+            "--printers-config",
+            default=PRINTERS_CONFIG_PATH,
+            help="TOML file with [[printer]] targets (used when it exists).",
         )
         parser.add_argument(
             "-d",
             "--date",
+            action="extend",
+            nargs="+",
+            default=None,
+            help=(
+                "ISO date(s) (YYYY-MM-DD) to fetch (defaults to today); "
+                "several dates are rendered as a batch."
+            ),
+        )
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            default=None,
+            help="First ISO date of a batch range (with --to).",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            default=None,
+            help="Last ISO date of a batch range (defaults to today).",
+        )
+        parser.add_argument(
+            "-j",
+            "--workers",
+            type=int,
+            default=BACKFILL_WORKERS,
+            help="Concurrent article downloads in batch mode.",
+        )
+        parser.add_argument(
+            "--async",
+            dest="run_async",
+            action="store_true",
+            help=(
+                "Run downloads, Typst and lpr as overlapping asyncio stages "
+                "(always compiles with `typst compile`)."
+            ),
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=None,
+            help="With --async, give up on unfinished issues after this many seconds.",
+        )
+        parser.add_argument(
+            "--typst-backend",
+            choices=TYPST_BACKENDS,
+            default="auto",
+            help=(
+                "How to run Typst: cold subprocess, Python binding or a "
+                "long-lived watch session (auto picks per run)."
+            ),
+        )
+        parser.add_argument(
+            "--layout",
+            choices=TYPST_LAYOUTS,
+            default=None,
+            help=(
+                "Page layout: A4 two columns, A5 booklet pages or a small e-ink "
+                "page (defaults to the source's layout)."
+            ),
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help=(
+                "Compile and print even if the same issue was already "
+                "rendered and printed."
+            ),
+        )
+        parser.add_argument(
+            "--stories",
+            metavar="SECONDS",
+            type=float,
+            nargs="?",
+            const=STORY_BUDGET_SECONDS,
+            default=None,
+            help=(
+                "Fetch the story each item links to and add its lede with a "
+                "QR code. The print takes the ledes already in, the kept PDF "
+                "and archive get the rest; stories not in within SECONDS "
+                f"(default {STORY_BUDGET_SECONDS}) keep just the link."
+            ),
+        )
+        parser.add_argument(
+            "--in-memory",
+            action="store_true",
+            help=(
+                "Pipe the Typst source to typst and the PDF to lpr without "
+                "writing .typ/.pdf files (only the print stamp is kept)."
+            ),
+        )
+        parser.add_argument(
+            "--digest",
+            action="store_true",
+            help=(
+                "Combine all requested dates into one document, compiled and "
+                "printed once (e.g. a weekly bundle)."
+            ),
+        )
+        parser.add_argument(
+            "--export",
+            default=None,
+            help=(
+                "Also save fetched issues as JSON: appended as one line per "
+                "issue to an .ndjson/.jsonl archive, or written to a .json file."
+            ),
+        )
+        parser.add_argument(
+            "--from-archive",
+            default=None,
+            help=(
+                "Render issues from a JSON/NDJSON archive instead of fetching "
+                "(all of them unless dates are given)."
+            ),
+        )
+        parser.add_argument(
+            "--archive",
+            default=ARCHIVE_PATH,
+            help="SQLite archive every fetched issue is added to.",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Do not add fetched issues to the archive.",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Print a per-stage timing summary at the end of the run.",
+        )
+        parser.add_argument(
+            "--profile-log",
+            default=None,
+            help="Append per-stage timings as JSON lines to this file (- for stderr).",
+        )
+        parser.add_argument(
+            "--serve",
+            action="store_true",
+            help=(
+                "Stay resident and print every day in the scheduled window "
+                "(07:02 on weekdays, 08:02 on weekends)."
+            ),
+        )
+        parser.add_argument(
+            "--relay",
+            metavar="[HOST:]PORT",
+            type=parse_relay_address,
+            default=None,
+            help=(
+                "Serve parsed issues and compiled PDFs to other print nodes "
+                f"over HTTP (e.g. {RELAY_PORT} or 127.0.0.1:{RELAY_PORT})."
+            ),
+        )
+        parser.add_argument(
+            "--from-relay",
+            metavar="URL",
             default=None,
-            help="ISO date (YYYY-MM-DD) to fetch (defaults to today).",
+            help=(
+                "Take issues and PDFs from a relay node, fetching from Deník N "
+                "directly when the relay fails."
+            ),
+        )
+        parser.add_argument(
+            "--status-file",
+            default=SERVE_STATUS_PATH,
+            help="JSON status file written by --serve.",
+        )
+        parser.add_argument(
+            "--assets-dir",
+            default=TYPST_ASSETS_DIR,
+            help="Directory with vendored Typst packages and fonts.",
+        )
+        parser.add_argument(
+            "--setup-assets",
+            action="store_true",
+            help="Download the Typst packages into --assets-dir and exit.",
+        )
+        parser.add_argument(
+            "--install-font",
+            action="append",
+            default=[],
+            help="Font file to copy into --assets-dir (with --setup-assets).",
         )
         parser.add_argument(
             "--poll",
@@ -639,56 +4249,362 @@ if __name__ == "__main__":
                 "(use with today's date)."
             ),
         )
+        parser.add_argument(
+            "--poll-timeout",
+            type=int,
+            default=POLL_TIMEOUT_MINUTES,
+            help="Give up polling after this many minutes.",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            default=CACHE_DIR,
+            help="Directory for cached feed and article pages.",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Do not read or write the on-disk cache.",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Render purely from the cache without network access.",
+        )
         args = parser.parse_args()
-        if args.date:
+        PROFILER.log_path = args.profile_log
+        show_profile = args.profile
+        if os.path.exists(args.sources_config):
+            NEWSLETTER_SOURCES.update(load_newsletter_sources(args.sources_config))
+        source_keys = args.source or [DEFAULT_SOURCE]
+        if "all" in source_keys:
+            source_keys = list(NEWSLETTER_SOURCES)
+        for key in source_keys + [getattr(args, "import_source", DEFAULT_SOURCE)]:
+            if key not in NEWSLETTER_SOURCES:
+                raise RuntimeError(
+                    f"Unknown source {key}; known: {', '.join(NEWSLETTER_SOURCES)}."
+                )
+        if args.command == "search":
+            archive = IssueArchive(args.archive)
             try:
-                target_date = date_type.fromisoformat(args.date)
-            except ValueError as exc:
-                raise RuntimeError("Date must be in ISO format YYYY-MM-DD.") from exc
+                matches = archive.search(" ".join(args.query), limit=args.limit)
+            finally:
+                archive.close()
+            for match in matches:
+                snippet = " ".join(match["snippet"].split())
+                print(
+                    f"{match['issue_date']} {match['source']} "
+                    f"#{match['position']}: {snippet}"
+                )
+                print(f"    {match['url']}")
+            if not matches:
+                print("No matches.")
+            raise SystemExit(0)
+        if args.command == "import":
+            archive = IssueArchive(args.archive)
+            try:
+                counts = import_saved_articles(
+                    archive, args.paths, NEWSLETTER_SOURCES[args.import_source]
+                )
+            finally:
+                archive.close()
+            print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+            raise SystemExit(0)
+        assets = TypstAssets(args.assets_dir)
+        if args.check:
+            rows = check_environment(assets, args.printers_config)
+            for name, ok, detail in rows:
+                print(f"{name:<14} {'ok' if ok else 'FAIL':<5} {detail}")
+            raise SystemExit(0 if all(ok for _, ok, _ in rows) else 1)
+        if args.setup_assets:
+            assets.install(args.install_font)
+            assets.preflight()
+            print(f"Typst assets ready in {assets.root}")
+            raise SystemExit(0)
+        if args.offline and args.no_cache:
+            raise RuntimeError("--offline needs the cache.")
+        cache = None if args.no_cache else HttpCache(args.cache_dir)
+        targets = [print_target(name) for name in args.printer]
+        if os.path.exists(args.printers_config):
+            targets.extend(load_print_targets(args.printers_config))
+        dates = [parse_iso_date(value) for value in args.date or []]
+        if args.date_from:
+            date_to = (
+                parse_iso_date(args.date_to) if args.date_to else date_type.today()
+            )
+            dates.extend(date_range(parse_iso_date(args.date_from), date_to))
+        elif args.date_to:
+            raise RuntimeError("--to needs --from.")
+        requested_dates = sorted(set(dates))
+        dates = requested_dates or [date_type.today()]
+        sinks = []
+        archive = None
+        if not args.no_archive and not args.from_archive:
+            try:
+                archive = IssueArchive(args.archive)
+            except (ArchiveError, sqlite3.Error, OSError) as exc:
+                print(f"Archive not available, issues will not be archived: {exc}")
+        if archive is not None:
+
+            def archive_issue(article):
+                try:
+                    archive.add(article)
+                except (ArchiveError, sqlite3.Error) as exc:
+                    print(f"Archive not updated: {exc}")
+
+            sinks.append(archive_issue)
+        if args.export:
+            sinks.append(lambda article: export_issues([article], args.export))
+        pollers = [
+            FeedPoller(source["feed_url"], cache, args.offline, source)
+            for source in (NEWSLETTER_SOURCES[key] for key in source_keys)
+        ]
+        compiler = make_typst_compiler(
+            args.typst_backend,
+            batch=args.serve
+            or (
+                not args.digest
+                and (len(dates) > 1 or len(pollers) > 1 or bool(args.from_archive))
+            ),
+            assets=assets,
+        )
+        relay = None
+        if args.from_relay and not args.offline:
+            relay = RelayClient(args.from_relay)
+            compiler = RelayTypstCompiler(relay, compiler)
         else:
-            target_date = date_type.today()
-        while True:
+            # The relay compiles for --from-relay; everything else compiles
+            # here, and only the CLI backends need the typst binary.
+            assets.preflight(
+                cli=args.run_async
+                or isinstance(compiler, (SubprocessTypstCompiler, WatchTypstCompiler)),
+                strict=False,
+            )
+        if args.relay:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
             try:
-                overview_url = fetch_latest_overview_url(target_date=target_date)
-                break
-            except DateNotAvailableError:
-                if not args.poll:
-                    raise
-                print(
-                    f"Date {target_date.isoformat()} not yet available; "
-                    f"retrying in {POLL_INTERVAL_SECONDS}s..."
+                serve_relay(
+                    IssueRelay(pollers, cache, compiler, sinks, args.stories),
+                    *args.relay,
+                )
+            except KeyboardInterrupt:
+                pass
+            finally:
+                compiler.close()
+        elif args.from_archive:
+            issues = select_archived_issues(
+                read_issue_archive(args.from_archive), requested_dates
+            )
+            try:
+                if args.digest:
+                    if not issues:
+                        raise RuntimeError("No archived issue for the digest.")
+                    pdf_path = render_digest(
+                        issues,
+                        args.dry,
+                        targets,
+                        compiler,
+                        args.layout,
+                        args.force,
+                        args.in_memory,
+                    )
+                    print(f"Digest: {pdf_path}")
+                else:
+                    for issue in issues:
+                        try:
+                            pdf_path = render_issue(
+                                issue,
+                                args.dry,
+                                targets,
+                                compiler,
+                                args.layout,
+                                args.force,
+                                args.in_memory,
+                            )
+                        except Exception as exc:
+                            print(f"{issue.get('issue_date')}: error {exc}")
+                        else:
+                            print(f"{issue.get('issue_date')}: ok {pdf_path}")
+            finally:
+                compiler.close()
+        elif args.serve:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            try:
+                serve(
+                    pollers,
+                    cache=cache,
+                    compiler=compiler,
+                    dry=args.dry,
+                    targets=targets,
+                    poll_timeout=args.poll_timeout,
+                    status_path=args.status_file,
+                    sinks=sinks,
+                    layout=args.layout,
+                    force=args.force,
+                    in_memory=args.in_memory,
+                    relay=relay,
+                    stories=args.stories,
+                )
+            finally:
+                compiler.close()
+        elif args.digest:
+            try:
+                results, pdf_path = digest(
+                    dates,
+                    pollers,
+                    cache=cache,
+                    offline=args.offline,
+                    dry=args.dry,
+                    targets=targets,
+                    workers=args.workers,
+                    compiler=compiler,
+                    sinks=sinks,
+                    layout=args.layout,
+                    force=args.force,
+                    in_memory=args.in_memory,
+                    relay=relay,
+                    stories=args.stories,
+                )
+            finally:
+                compiler.close()
+            if cache:
+                cache.evict()
+            for key, day, status, detail in results:
+                label = f"{key} {day}" if len(pollers) > 1 else day.isoformat()
+                print(f"{label}: {status} {detail}")
+            if pdf_path is None:
+                raise RuntimeError("No issue found for the digest.")
+            print(f"Digest: {pdf_path}")
+        elif args.run_async:
+            import asyncio
+
+            compiler.close()
+            results = asyncio.run(
+                run_pipeline(
+                    dates,
+                    pollers,
+                    cache=cache,
+                    offline=args.offline,
+                    dry=args.dry,
+                    targets=targets,
+                    compiler=AsyncTypstCompiler(assets.typst_args()),
+                    sinks=sinks,
+                    layout=args.layout,
+                    force=args.force,
+                    in_memory=args.in_memory,
+                    workers=args.workers,
+                    poll=args.poll and not args.offline,
+                    poll_timeout=args.poll_timeout,
+                    timeout=args.timeout,
+                    stories=args.stories,
+                    relay=relay,
                 )
-                time.sleep(POLL_INTERVAL_SECONDS)
-        article = fetch_article(overview_url)
-        print(f"Overview for {target_date.isoformat()}:")
-        print(article["date"])
-        print(article["title"])
-        print(article["url"])
-        print()
-        date_only = extract_date_only(article.get("date")) or "unknown-date"
-        output_path = f"rannich-5minut-{date_only}.typ"
-        with open(output_path, "w", encoding="utf-8") as handle:
-            handle.write(format_typst(article))
-        print(f"Typst file written: {output_path}")
-        subprocess.run(["typst", "compile", output_path], check=True)
-        pdf_path = (
-            f"{output_path[:-4]}.pdf"
-            if output_path.lower().endswith(".typ")
-            else f"{output_path}.pdf"
-        )
-        if not args.dry:
-            lpr_command = ["lpr"]
-            if args.printer:
-                lpr_command.extend(["-P", args.printer])
-            lpr_command.extend(
-                [
-                    "-o",
-                    "sides=two-sided-long-edge",
-                    "-o",
-                    "media=iso_a4_210x297mm",
-                    pdf_path,
-                ]
             )
-            subprocess.run(lpr_command, check=True)
+            if cache:
+                cache.evict()
+            for key, day, status, detail in results:
+                label = f"{key} {day}" if len(pollers) > 1 else day.isoformat()
+                print(f"{label}: {status} {detail}")
+        elif len(dates) > 1 or len(pollers) > 1:
+            try:
+                results = backfill(
+                    dates,
+                    pollers,
+                    cache=cache,
+                    offline=args.offline,
+                    dry=args.dry,
+                    targets=targets,
+                    workers=args.workers,
+                    compiler=compiler,
+                    sinks=sinks,
+                    layout=args.layout,
+                    force=args.force,
+                    in_memory=args.in_memory,
+                    poll=args.poll and not args.offline,
+                    poll_timeout=args.poll_timeout,
+                    relay=relay,
+                    stories=args.stories,
+                )
+            finally:
+                compiler.close()
+            if cache:
+                cache.evict()
+            for key, day, status, detail in results:
+                label = f"{key} {day}" if len(pollers) > 1 else day.isoformat()
+                print(f"{label}: {status} {detail}")
+        else:
+            target_date = dates[0]
+            poller = pollers[0]
+            poll = args.poll and not args.offline
+            article = None
+            if relay is not None:
+                article = fetch_from_relay(
+                    relay, poller, target_date, poll, args.poll_timeout
+                )
+            if article is None:
+                overview_url = wait_for_overview_url(
+                    poller,
+                    target_date,
+                    poll=poll,
+                    timeout_minutes=args.poll_timeout,
+                )
+                article = fetch_article(
+                    overview_url,
+                    cache=cache,
+                    offline=args.offline,
+                    source=poller.source,
+                )
+            prefetch = None
+            if args.stories is not None:
+                prefetch = StoryPrefetch(article, cache, args.offline, args.stories)
+                article = prefetch.article()
+            if cache:
+                cache.evict()
+            print(f"Overview for {target_date.isoformat()}:")
+            print(article["date"])
+            print(article["title"])
+            print(article["url"])
+            print()
+            if prefetch is None:
+                for sink in sinks:
+                    sink(article)
+            try:
+                render_issue(
+                    article,
+                    dry=args.dry,
+                    targets=targets,
+                    compiler=compiler,
+                    layout=args.layout,
+                    force=args.force,
+                    in_memory=args.in_memory,
+                )
+            except Exception:
+                if prefetch is not None:
+                    finish_stories(prefetch, sinks)
+                raise
+            else:
+                if prefetch is not None:
+                    finish_stories(
+                        prefetch,
+                        sinks,
+                        (
+                            None
+                            if args.in_memory
+                            else lambda article: render_issue(
+                                article,
+                                dry=True,
+                                targets=targets,
+                                compiler=compiler,
+                                layout=args.layout,
+                            )
+                        ),
+                    )
+            finally:
+                compiler.close()
     except Exception as e:
         print(f"Error exporting overview: {e}")
+        # Non-zero so systemd's Restart=on-failure brings --serve/--relay back.
+        raise SystemExit(1)
+    finally:
+        if show_profile:
+            print()
+            print(PROFILER.summary())